@@ -0,0 +1,289 @@
+# Author - Karan Parmar
+
+"""
+BINANCE EXCHANGE INFO CACHE
+
+	Keeps an in-process symbol -> info index of the exchange-info payload so lookups do not download
+	the whole payload on every call. The index is refreshed by a background thread every TTL seconds.
+
+	Alongside the index a per-symbol filter table (LOT_SIZE, MARKET_LOT_SIZE, PRICE_FILTER, MIN_NOTIONAL/NOTIONAL)
+	is pre-parsed into Decimals so orders can be rounded and validated locally before they are sent.
+"""
+
+# Importing built-in libraries
+import time
+from decimal import Decimal, ROUND_FLOOR, ROUND_CEILING
+from threading import Thread, Lock, Event
+
+# Importing third-party libraries
+import numpy as np					# pip install numpy
+import pandas as pd					# pip install pandas
+
+class BinanceSymbolFilters:
+
+	def __init__(self, info:dict):
+		"""
+		Params:
+			info	:	dict	= symbol information from the exchange info payload
+		"""
+		filters = {i['filterType']: i for i in info.get('filters', [])}
+
+		self.symbol = info['symbol']
+
+		lot = filters.get('LOT_SIZE', {})
+		self.step_size = Decimal(lot.get('stepSize', '0'))
+		self.min_qty = Decimal(lot.get('minQty', '0'))
+		self.max_qty = Decimal(lot.get('maxQty', '0'))
+
+		# MARKET_LOT_SIZE may be absent or zeroed, fall back to LOT_SIZE
+		market_lot = filters.get('MARKET_LOT_SIZE', {})
+		self.market_step_size = Decimal(market_lot.get('stepSize', '0')) or self.step_size
+		self.market_min_qty = Decimal(market_lot.get('minQty', '0')) or self.min_qty
+		self.market_max_qty = Decimal(market_lot.get('maxQty', '0')) or self.max_qty
+
+		price_filter = filters.get('PRICE_FILTER', {})
+		self.tick_size = Decimal(price_filter.get('tickSize', '0'))
+		self.min_price = Decimal(price_filter.get('minPrice', '0'))
+		self.max_price = Decimal(price_filter.get('maxPrice', '0'))
+
+		# Spot uses MIN_NOTIONAL/NOTIONAL with minNotional, futures uses MIN_NOTIONAL with notional
+		notional = filters.get('NOTIONAL') or filters.get('MIN_NOTIONAL') or {}
+		self.min_notional = Decimal(notional.get('minNotional', notional.get('notional', '0')))
+
+		self.quantity_precision = max(0, -self.step_size.normalize().as_tuple().exponent) if self.step_size else info.get('quantityPrecision', info.get('baseAssetPrecision', 8))
+		self.price_precision = max(0, -self.tick_size.normalize().as_tuple().exponent) if self.tick_size else info.get('pricePrecision', info.get('quotePrecision', 8))
+
+	# Helper methods
+	@staticmethod
+	def _to_step(value:Decimal, step:Decimal, rounding:str) -> Decimal:
+		"""
+		Rounds value to a multiple of step\n
+		"""
+		if not step:
+			return value
+		return ((value / step).to_integral_value(rounding=rounding) * step).quantize(step.normalize())
+
+	# Public methods
+	def round_quantity(self, quantity:float, market:bool=False) -> Decimal:
+		"""
+		Rounds quantity down to the symbol step size\n
+		"""
+		step = self.market_step_size if market else self.step_size
+		return self._to_step(Decimal(str(quantity)), step, ROUND_FLOOR)
+
+	def round_price(self, price:float, side:str) -> Decimal:
+		"""
+		Rounds price to the symbol tick size\n
+		NOTE Buy prices are rounded down and sell prices up so the order never becomes more aggressive than requested\n
+		"""
+		rounding = ROUND_FLOOR if side.upper() == 'BUY' else ROUND_CEILING
+		return self._to_step(Decimal(str(price)), self.tick_size, rounding)
+
+	def validate(self, quantity:Decimal, price:Decimal=None, market:bool=False) -> None:
+		"""
+		Raises if the rounded order would be rejected by the symbol filters\n
+		"""
+		min_qty, max_qty = (self.market_min_qty, self.market_max_qty) if market else (self.min_qty, self.max_qty)
+		if quantity <= 0 or quantity < min_qty or (max_qty and quantity > max_qty):
+			raise Exception(f"{self.symbol} quantity {quantity} outside LOT_SIZE [{min_qty}, {max_qty}] after rounding to step")
+
+		if price is not None:
+			if price <= 0 or (self.min_price and price < self.min_price) or (self.max_price and price > self.max_price):
+				raise Exception(f"{self.symbol} price {price} outside PRICE_FILTER [{self.min_price}, {self.max_price}]")
+			if self.min_notional and quantity * price < self.min_notional:
+				raise Exception(f"{self.symbol} notional {quantity * price} below minimum {self.min_notional}")
+
+	def round_order(self, side:str, quantity:float, price:float=None, order_type:str="MARKET") -> tuple:
+		"""
+		Rounds and validates an order\n
+		Returns:
+			(quantity, price) as strings ready to be sent, price is None when not given
+		"""
+		market = order_type.upper() == 'MARKET'
+		quantity = self.round_quantity(quantity, market=market)
+		price = self.round_price(price, side) if price is not None else None
+		self.validate(quantity, price, market=market)
+		return format(quantity, 'f'), (format(price, 'f') if price is not None else None)
+
+class BinanceExchangeInfoCache:
+
+	# One running cache per market and network shared by every adapter in the process, see shared
+	_shared = {}
+	_shared_lock = Lock()
+
+	def __init__(self, fetch, ttl:float=300):
+		"""
+		Params:
+			fetch	:	callable	= returns the list of symbol dicts. ie. lambda: client.get_exchange_info()['symbols']
+			ttl		:	float		= seconds between background refreshes
+		"""
+		self.TTL = ttl
+
+		self._fetch = fetch
+		self._index = {}
+		self._filters = {}
+		self._lock = Lock()
+		self._stop = Event()
+		self._thread = None
+		self.last_refresh = 0
+
+	# Private methods
+	def _run(self) -> None:
+		"""
+		Refreshes the index every TTL seconds until stopped\n
+		"""
+		while not self._stop.wait(self.TTL):
+			try:
+				self.refresh()
+			except Exception as e:
+				# Keep serving the last good index and retry on the next tick
+				print("EXCHANGE_INFO_REFRESH_ERROR", e)
+
+	# Public methods
+	@classmethod
+	def shared(cls, market:str, testnet:bool, fetch, ttl:float=300) -> 'BinanceExchangeInfoCache':
+		"""
+		Returns the running cache of the market, created and started on first use\n
+		Params:
+			market	:	str			= cache key. ie. SPOT, MARGIN or FUTURES
+			testnet	:	bool		= testnet and live symbols are kept apart
+			fetch	:	callable	= returns the list of symbol dicts, replaces the fetch of an existing cache
+			ttl		:	float		= seconds between background refreshes, set by the first caller
+		NOTE Reconnecting adapters reuse the cache with their new client, no extra refresher thread is started\n
+		"""
+		with cls._shared_lock:
+			cache = cls._shared.get((market, testnet))
+			if cache is None:
+				cache = cls._shared[(market, testnet)] = cls(fetch, ttl=ttl)
+			else:
+				cache._fetch = fetch
+			if cache._thread is None or not cache._thread.is_alive():
+				cache.start()
+			return cache
+
+	def start(self) -> None:
+		"""
+		Loads the index once and starts the background refresher\n
+		"""
+		self.refresh()
+		if self._thread is None or not self._thread.is_alive():
+			self._stop.clear()
+			self._thread = Thread(target=self._run, daemon=True)
+			self._thread.start()
+
+	def stop(self) -> None:
+		"""
+		Stops the background refresher\n
+		"""
+		self._stop.set()
+
+	def refresh(self) -> None:
+		"""
+		Downloads the exchange info and swaps in a new index\n
+		"""
+		index = {i['symbol']: i for i in self._fetch()}
+		filters = {symbol: BinanceSymbolFilters(info) for symbol, info in index.items() if 'filters' in info}
+		with self._lock:
+			self._index = index
+			self._filters = filters
+			self.last_refresh = time.time()
+
+	def get(self, symbol:str) -> dict:
+		"""
+		Returns symbol information from the index, None if the symbol is unknown\n
+		"""
+		if not self._index:
+			self.refresh()
+		return self._index.get(symbol.upper())
+
+	def symbols(self) -> list:
+		"""
+		Returns all indexed symbols\n
+		"""
+		return list(self._index)
+
+	def get_filters(self, symbol:str) -> BinanceSymbolFilters:
+		"""
+		Returns the pre-parsed filters of the symbol, None if the symbol is unknown\n
+		"""
+		if not self._index:
+			self.refresh()
+		return self._filters.get(symbol.upper())
+
+	def round_order(self, symbol:str, side:str, quantity:float, price:float=None, order_type:str="MARKET") -> tuple:
+		"""
+		Rounds and validates an order against the symbol filters\n
+		Returns:
+			(quantity, price) as strings ready to be sent, price is None when not given
+		NOTE Unknown symbols are not rounded and left to the exchange to judge, their values are still written positionally
+		so a float like 1e-05 is sent as 0.00001\n
+		"""
+		filters = self.get_filters(symbol)
+		if filters is None:
+			return (
+				np.format_float_positional(float(quantity), trim='-'),
+				np.format_float_positional(float(price), trim='-') if price is not None else None,
+			)
+		return filters.round_order(side, quantity, price, order_type)
+
+	def validate_orders(self, symbols:list, quantities:list, prices:list=None, sides:list=None) -> pd.DataFrame:
+		"""
+		Rounds and validates a basket of orders at once\n
+		Params:
+			symbols		:	list	= symbols of the orders
+			quantities	:	list	= quantities of the orders
+			prices		:	list	= limit prices of the orders, None or NaN for market orders
+			sides		:	list	= sides of the orders, used to round prices. default buy
+		Returns:
+			DataFrame with rounded quantity and price, notional, valid flag and rejection reason per order
+		"""
+		if not self._index:
+			self.refresh()
+		symbols = [s.upper() for s in symbols]
+		n = len(symbols)
+		quantities = np.asarray(quantities, dtype=float)
+		prices = np.full(n, np.nan) if prices is None else np.asarray([np.nan if p is None else p for p in prices], dtype=float)
+		sell = np.zeros(n, dtype=bool) if sides is None else np.asarray([s.upper() == 'SELL' for s in sides])
+		market = np.isnan(prices)
+
+		known = np.asarray([s in self._filters for s in symbols])
+		filters = [self._filters.get(s) for s in symbols]
+		def column(attr:str, market_attr:str=None) -> np.ndarray:
+			return np.asarray([
+				float(getattr(f, market_attr if (market_attr and m) else attr)) if f else 0.0
+				for f, m in zip(filters, market)
+			])
+
+		step = column('step_size', 'market_step_size')
+		min_qty = column('min_qty', 'market_min_qty')
+		max_qty = column('max_qty', 'market_max_qty')
+		tick = column('tick_size')
+		min_price = column('min_price')
+		max_price = column('max_price')
+		min_notional = column('min_notional')
+
+		# Integer step units avoid float drift, the epsilon absorbs representation error of exact multiples
+		with np.errstate(divide='ignore', invalid='ignore'):
+			qty_units = np.floor(quantities / step + 1e-9)
+			rounded_qty = np.where(step > 0, qty_units * step, quantities)
+			price_units = np.where(sell, np.ceil(prices / tick - 1e-9), np.floor(prices / tick + 1e-9))
+			rounded_price = np.where(tick > 0, price_units * tick, prices)
+		notional = rounded_qty * rounded_price
+
+		reason = np.full(n, '', dtype=object)
+		reason[~known] = 'UNKNOWN_SYMBOL'
+		bad_qty = known & ((rounded_qty <= 0) | (rounded_qty < min_qty) | ((max_qty > 0) & (rounded_qty > max_qty)))
+		reason[bad_qty & (reason == '')] = 'LOT_SIZE'
+		bad_price = known & ~market & ((rounded_price <= 0) | ((min_price > 0) & (rounded_price < min_price)) | ((max_price > 0) & (rounded_price > max_price)))
+		reason[bad_price & (reason == '')] = 'PRICE_FILTER'
+		bad_notional = known & ~market & (min_notional > 0) & (notional < min_notional)
+		reason[bad_notional & (reason == '')] = 'MIN_NOTIONAL'
+
+		return pd.DataFrame({
+			'symbol':symbols,
+			'quantity':rounded_qty,
+			'price':rounded_price,
+			'notional':notional,
+			'valid':reason == '',
+			'reason':reason,
+		})
@@ -0,0 +1,260 @@
+# Author - Karan Parmar
+
+"""
+BINANCE FUTURES ORDER BOOK
+
+	Exact local replica of the Binance FUTURES order book built from a REST depth snapshot and <symbol>@depth@100ms diff events.
+	Events are checked against the snapshot with U/u and chained with pu, any gap drops the book and a new snapshot is taken.
+	Snapshots download on worker threads while the events of that symbol are buffered, the socket thread never waits on REST.
+
+	Each side is a pair of sorted arrays ordered so the best level is last, price lookups are a binary search, best bid/ask is
+	the last element. Inserts and deletes shift the list, O(n), which stays cheap as changes cluster at the best level.
+"""
+
+# Importing built-in libraries
+from bisect import bisect_left
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+# Importing third-party libraries
+import numpy as np							# pip install numpy
+
+# Importing local modules
+from api_binance_ws import BinanceWSAPP
+
+class BinanceBookSide:
+
+	def __init__(self, is_bid:bool):
+		"""
+		Params:
+			is_bid	:	bool	= bids side, asks are keyed by negative price so both sides keep the best level last
+		"""
+		self.IS_BID = is_bid
+
+		self._keys = []
+		self._qtys = []
+
+	def __len__(self) -> int:
+		return len(self._keys)
+
+	# Public methods
+	def clear(self) -> None:
+		self._keys.clear()
+		self._qtys.clear()
+
+	def update(self, price:float, qty:float) -> None:
+		"""
+		Sets the quantity of a price level, 0 removes the level\n
+		"""
+		key = price if self.IS_BID else -price
+		keys = self._keys
+		i = bisect_left(keys, key)
+		if i < len(keys) and keys[i] == key:
+			if qty:
+				self._qtys[i] = qty
+			else:
+				del keys[i]
+				del self._qtys[i]
+		elif qty:
+			keys.insert(i, key)
+			self._qtys.insert(i, qty)
+
+	def load(self, levels:list) -> None:
+		"""
+		Replaces the side with snapshot levels [[price, qty], ...]\n
+		"""
+		book = sorted((float(p) if self.IS_BID else -float(p), float(q)) for p, q in levels if float(q))
+		self._keys = [k for k, _ in book]
+		self._qtys = [q for _, q in book]
+
+	def best(self) -> tuple:
+		"""
+		Returns (price, qty) of the best level or (None, None) when empty\n
+		"""
+		if not self._keys:
+			return None, None
+		key = self._keys[-1]
+		return (key if self.IS_BID else -key), self._qtys[-1]
+
+	def get_qty(self, price:float) -> float:
+		"""
+		Returns the quantity resting at a price\n
+		"""
+		key = price if self.IS_BID else -price
+		i = bisect_left(self._keys, key)
+		if i < len(self._keys) and self._keys[i] == key:
+			return self._qtys[i]
+		return 0.0
+
+	def get_levels(self, n:int=None) -> np.ndarray:
+		"""
+		Returns the top n levels as [[price, qty], ...] best first\n
+		"""
+		n = len(self._keys) if n is None else min(n, len(self._keys))
+		levels = np.empty((n, 2))
+		if n:
+			levels[:, 0] = self._keys[:-n - 1:-1]
+			levels[:, 1] = self._qtys[:-n - 1:-1]
+			if not self.IS_BID:
+				levels[:, 0] *= -1
+		return levels
+
+class BinanceFuturesOrderBook:
+
+	def __init__(self, symbol:str):
+		"""
+		Params:
+			symbol	:	str		= symbol of the book. ie. BTCUSDT
+		"""
+		self.symbol = symbol.upper()
+		self.bids = BinanceBookSide(is_bid=True)
+		self.asks = BinanceBookSide(is_bid=False)
+
+		self.last_update_id = None
+		self.event_time = None
+		self.resyncs = 0
+		self._previous_u = None
+
+	@property
+	def is_synced(self) -> bool:
+		return self.last_update_id is not None
+
+	# Public methods
+	def reset(self) -> None:
+		"""
+		Drops the book, the next event takes a new snapshot\n
+		"""
+		self.last_update_id = None
+		self._previous_u = None
+		self.bids.clear()
+		self.asks.clear()
+
+	def load_snapshot(self, snapshot:dict) -> None:
+		"""
+		Loads a REST depth snapshot. ie. client.futures_order_book(symbol=symbol, limit=1000)\n
+		"""
+		self.bids.load(snapshot['bids'])
+		self.asks.load(snapshot['asks'])
+		self.last_update_id = snapshot['lastUpdateId']
+		self._previous_u = None
+
+	def apply(self, event:dict) -> bool:
+		"""
+		Applies a depthUpdate event\n
+		Returns:
+			False when the event does not continue the book, the book is reset and needs a new snapshot
+		"""
+		if event['u'] < self.last_update_id:
+			return True
+
+		if self._previous_u is None:
+			# First event after the snapshot must straddle it
+			if event['U'] > self.last_update_id:
+				self.reset()
+				self.resyncs += 1
+				return False
+		elif event['pu'] != self._previous_u:
+			self.reset()
+			self.resyncs += 1
+			return False
+
+		update = self.bids.update
+		for price, qty in event['b']:
+			update(float(price), float(qty))
+		update = self.asks.update
+		for price, qty in event['a']:
+			update(float(price), float(qty))
+
+		self._previous_u = event['u']
+		self.last_update_id = event['u']
+		self.event_time = event.get('E')
+		return True
+
+	def get_best_bid(self) -> tuple:
+		return self.bids.best()
+
+	def get_best_ask(self) -> tuple:
+		return self.asks.best()
+
+	def get_order_book(self, levels:int=None) -> dict:
+		"""
+		Returns the top levels of both sides as arrays of [price, qty] best first\n
+		"""
+		return {
+			'lastUpdateId':self.last_update_id,
+			'bids':self.bids.get_levels(levels),
+			'asks':self.asks.get_levels(levels),
+		}
+
+class BinanceFuturesBookStream(BinanceWSAPP):
+
+	def __init__(self, symbols:list, get_snapshot, testnet:bool=False, snapshot_workers:int=4):
+		"""
+		Params:
+			symbols				:	list		= symbols to replicate. ie. ['BTCUSDT']
+			get_snapshot		:	callable	= REST depth of a symbol. ie. lambda symbol: client.futures_order_book(symbol=symbol, limit=1000)
+			testnet				:	bool		= connect to the testnet stream endpoints
+			snapshot_workers	:	int			= snapshots downloaded at once
+		"""
+		super().__init__([f"{s.lower()}@depth@100ms" for s in symbols], market="FUTURES", testnet=testnet)
+
+		self._get_snapshot = get_snapshot
+		self.books = {s.upper(): BinanceFuturesOrderBook(s) for s in symbols}
+
+		# Events buffered per symbol while its snapshot downloads, None when no download is in flight
+		self._buffers = {s.upper(): None for s in symbols}
+		self._locks = {s.upper(): Lock() for s in symbols}
+		self._executor = ThreadPoolExecutor(max_workers=snapshot_workers)
+
+	# Private methods
+	def _on_open(self, ws) -> None:
+		"""
+		Events missed while disconnected cannot be replayed, every book of the socket is resynced\n
+		"""
+		for symbol, book in self.books.items():
+			with self._locks[symbol]:
+				book.reset()
+				self._buffers[symbol] = None
+
+	def _apply(self, book:BinanceFuturesOrderBook, data:dict) -> bool:
+		if book.apply(data):
+			return True
+		print("BINANCE_BOOK_RESYNC", book.symbol, data['U'], data['u'], data['pu'])
+		return False
+
+	def _load_snapshot(self, book:BinanceFuturesOrderBook) -> None:
+		"""
+		Downloads the snapshot on a worker thread, then loads it and replays the events buffered meanwhile\n
+		"""
+		try:
+			snapshot = self._get_snapshot(book.symbol)
+		except Exception as e:
+			print("BINANCE_BOOK_SNAPSHOT_ERROR", book.symbol, e)
+			snapshot = None
+
+		with self._locks[book.symbol]:
+			buffer, self._buffers[book.symbol] = self._buffers[book.symbol], None
+			# No buffer means the socket reconnected during the download, the next event starts a new one
+			if snapshot is None or buffer is None:
+				return
+			book.load_snapshot(snapshot)
+			for event in buffer:
+				if not self._apply(book, event):
+					return
+
+	def _on_stream(self, stream:str, data:dict) -> None:
+		book = self.books.get(data['s'])
+		if book is None:
+			return
+		with self._locks[book.symbol]:
+			if book.is_synced:
+				self._apply(book, data)
+			elif self._buffers[book.symbol] is None:
+				self._buffers[book.symbol] = [data]
+				self._executor.submit(self._load_snapshot, book)
+			else:
+				self._buffers[book.symbol].append(data)
+
+	# Public methods
+	def get_book(self, symbol:str) -> BinanceFuturesOrderBook:
+		return self.books[symbol.upper()]
@@ -5,12 +5,58 @@ Binance FUTURES API REST
 """
 
 # Importing built-in libraries
-import pytz							# pip install pytz
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # Importing third-party libraries
 import pandas as pd					# pip install pandas
 from binance.client import Client	# pip install python-binance
+from binance.exceptions import BinanceAPIException
+
+# Importing local modules
+from api_binance_exchange_info import BinanceExchangeInfoCache
+from api_binance_futures_book import BinanceFuturesBookStream, BinanceFuturesOrderBook
+from api_binance_klines import BinanceKlineBackfill
+from api_binance_rate_limit import BinanceRequestScheduler
+from api_binance_trades import BinanceTradeStore, BinanceTradeSync
+from api_binance_ws import BinanceKlineStream, BinanceDepthStream, BinanceMarkPriceStream, BinanceUserDataStream
+from api_binance_ws_api import BinanceWSAPIClient
+
+class BinanceFuturesAccountConfig:
+
+	def __init__(self):
+
+		self.dual_side_position = None
+		self.leverage = {}
+		self.margin_type = {}
+
+	# Public methods
+	def load(self, client:Client) -> None:
+		"""
+		Loads position mode, per symbol leverage and margin type in two requests, position mode and symbolConfig\n
+		"""
+		self.dual_side_position = client.futures_get_position_mode()['dualSidePosition']
+		self.load_positions(client)
+
+	def load_positions(self, client:Client) -> None:
+		"""
+		Loads leverage and margin type of every symbol in one /fapi/v1/symbolConfig request\n
+		NOTE symbolConfig lists every symbol, positionRisk v3 has no leverage or marginType fields\n
+		"""
+		for config in client.futures_symbol_config():
+			self.leverage[config['symbol']] = int(config['leverage'])
+			self.margin_type[config['symbol']] = "ISOLATED" if config['marginType'].lower() == 'isolated' else "CROSSED"
+
+	def on_event(self, data:dict) -> None:
+		"""
+		Keeps the configuration current from user data stream events\n
+		"""
+		if data.get('e') == 'ACCOUNT_CONFIG_UPDATE' and 'ac' in data:
+			self.leverage[data['ac']['s']] = int(data['ac']['l'])
+
+		elif data.get('e') == 'ACCOUNT_UPDATE':
+			for position in data['a'].get('P', []):
+				if 'mt' in position:
+					self.margin_type[position['s']] = "ISOLATED" if position['mt'].lower() == 'isolated' else "CROSSED"
 
 class BinanceFuturesAPIREST:
 
@@ -20,21 +66,55 @@ class BinanceFuturesAPIREST:
 	BROKER = "BINANCE"
 	MARKET = "FUTURES"
 
-	def __init__(self, creds:dict):
+	# Orders per /fapi/v1/batchOrders request
+	BATCH_ORDERS_LIMIT = 5
+	BATCH_CANCEL_LIMIT = 10
+
+	# Local order and balance store, set by start_user_stream
+	_user_stream = None
+
+	def __init__(self, creds:dict, exchange_info_ttl:float=300, order_transport:str="REST", trade_store:str=None):
 
 		self.CREDS = creds
+		self.EXCHANGE_INFO_TTL = exchange_info_ttl
+		self.ORDER_TRANSPORT = order_transport.upper()
+
+		# Paginated concurrent kline downloads, paced by the shared request scheduler
+		self._kline_backfill = BinanceKlineBackfill(lambda **params: self.client.futures_klines(**params), limit=1000)
+
+		# Last seen trade id per symbol for incremental fill sync, one file per account
+		trade_store = trade_store or BinanceTradeStore.default_path(self.MARKET, creds['api_key'])
+		self._trade_sync = BinanceTradeSync(lambda **params: self.client.futures_account_trades(**params), trade_store, limit=1000)
 
 	# Public methods
-	def connect(self) -> None:
+	def connect(self, ping:bool=True) -> None:
 		"""
 		Connects to Binance Futures account\n
+		Params:
+			ping	:	bool	=	ping the server while connecting. False skips the extra round trip
 		"""
 		self.client = Client(
 			api_key=self.CREDS['api_key'],
 			api_secret=self.CREDS['api_secret'],
 			testnet=self.CREDS['account_type'].lower() in ['testnet','sandbox','test','demo'],
+			ping=ping,
 		)
 
+		# Request weight pacing shared by every Binance client in the process
+		BinanceRequestScheduler.attach(self.client)
+
+		# Orders over a persistent websocket api session instead of one signed HTTPS request each
+		if self.ORDER_TRANSPORT == "WS":
+			self._ws_api = BinanceWSAPIClient(self.CREDS['api_key'], self.CREDS['api_secret'], market=self.MARKET, testnet=self.client.testnet)
+			self._ws_api.connect()
+
+		# Symbol -> info index refreshed in the background, one per market shared by every adapter
+		self._exchange_info = BinanceExchangeInfoCache.shared("FUTURES", self.client.testnet, lambda: self.client.futures_exchange_info()['symbols'], ttl=self.EXCHANGE_INFO_TTL)
+
+		# Position mode, leverage and margin type cached to skip redundant configuration calls
+		self._account_config = BinanceFuturesAccountConfig()
+		self._account_config.load(self.client)
+
 	def get_account_info(self) -> dict:
 		"""
 		Get connected account info\n
@@ -44,40 +124,135 @@ class BinanceFuturesAPIREST:
 	def get_asset_info(self, asset:str) -> dict:
 		"""
 		Get asset information\n
+		NOTE Served from the in-process exchange info index, refreshed every EXCHANGE_INFO_TTL seconds\n
 		"""
-		symbols = self.client.futures_exchange_info()['symbols']
-		for i in symbols:
-			if i['symbol'] == asset.upper():
-				return i
+		return self._exchange_info.get(asset)
 
 	def get_account_balance(self, asset:str="USDT") -> float:
 		"""
 		Get connected aaccount's free asset balance\n
+		NOTE Always read over REST, the user data stream does not carry withdrawAvailable\n
 		"""
 		for i in self.client.futures_account_balance():
 			if i['asset'] == asset.upper():
 				return float(i['withdrawAvailable'])
+
+	def get_wallet_balance(self, asset:str="USDT") -> float:
+		"""
+		Get connected aaccount's cross wallet balance of the asset\n
+		NOTE Wallet balance includes margin held by positions and open orders, size orders with get_account_balance.
+		With the user data stream running it is answered from ACCOUNT_UPDATE, REST on cache miss\n
+		"""
+		balance = self._user_stream and self._user_stream.get_balance(asset)
+		if not balance:
+			for i in self.client.futures_account_balance():
+				if i['asset'] == asset.upper():
+					balance = i
+					self._user_stream and self._user_stream.put_balance(asset, balance)
+		return float(balance['crossWalletBalance']) if balance else None
 		
-	def get_candle_data(self, symbol:str, timeframe:str, period:str='1d') -> pd.DataFrame:
+	def get_candle_data(self, symbol:str, timeframe:str, period:str='1d', max_workers:int=4) -> pd.DataFrame:
 		"""
 		Returns historcal klines from past for given symbol and interval\n
+		NOTE The period is split into 1000 candle windows fetched concurrently on max_workers threads\n
 		"""
 		if period[-1] == 'd':
 			pastDays = int(period[:-1])
 		start_str=str((pd.to_datetime('today')-pd.Timedelta(str(pastDays)+' days')).date())
-		df = pd.DataFrame(self.client.futures_klines(symbol=symbol,start_str=start_str,interval=timeframe))
-		df.columns = ['open_time','open', 'high', 'low', 'close', 'volume', 'close_time', 'qav', 'num_trades', 'taker_base_vol', 'taker_quote_vol','is_best_match']
-		df.index = [datetime.fromtimestamp(x/1000, tz=pytz.timezone('UTC')) for x in df.open_time]
-		df = df[['open', 'high', 'low', 'close', 'volume']]
-		
-		df['open'] = df['open'].astype(float)
-		df['high'] = df['high'].astype(float)
-		df['low'] = df['low'].astype(float)
-		df['close'] = df['close'].astype(float)
-		df['volume'] = df['volume'].astype(float)
-		
-		df.index.name = 'datetime'
-		return df
+		start_ms = int(pd.Timestamp(start_str, tz='UTC').timestamp() * 1000)
+		return self._kline_backfill.get_candle_data(symbol=symbol, interval=timeframe, start_ms=start_ms, max_workers=max_workers)
+
+	def stream_candle_data(self, symbols:list, timeframe:str, size:int=1000, period:str=None) -> BinanceKlineStream:
+		"""
+		Streams live klines into per symbol ring buffers\n
+		Params:
+			symbols		:	list	=	symbols to stream. ie. ['BTCUSDT','ETHUSDT']
+			timeframe	:	str		=	kline interval. ie. 1m
+			size		:	int		=	bars kept per symbol
+			period		:	str		=	seeds the buffers from get_candle_data when given. ie. 1d
+		Returns:
+			The running stream, read it with get_streamed_candle_data or stream.get_view(symbol)
+		"""
+		self._kline_stream = BinanceKlineStream(symbols, timeframe, market=self.MARKET, testnet=self.client.testnet, size=size)
+		if period is not None:
+			for symbol in symbols:
+				self._kline_stream.seed(symbol, self.get_candle_data(symbol, timeframe, period=period))
+		self._kline_stream.start()
+		return self._kline_stream
+
+	def get_streamed_candle_data(self, symbol:str) -> pd.DataFrame:
+		"""
+		Returns the streamed candles of the symbol without downloading history again\n
+		"""
+		return self._kline_stream.get_candle_data(symbol)
+
+	def stream_order_books(self, symbols:list, levels:int=20, streams_per_connection:int=None) -> BinanceDepthStream:
+		"""
+		Streams top N depth snapshots of many symbols multiplexed over a few sockets\n
+		Params:
+			symbols					:	list	=	symbols to stream. ie. ['BTCUSDT','ETHUSDT']
+			levels					:	int		=	book depth, 5, 10 or 20
+			streams_per_connection	:	int		=	spreads the symbols over more sockets, capped by the exchange limit
+		Returns:
+			The running stream, read it with get_streamed_order_book or stream.get_top_of_books()
+		"""
+		self._depth_stream = BinanceDepthStream(symbols, levels=levels, market=self.MARKET, testnet=self.client.testnet, streams_per_connection=streams_per_connection)
+		self._depth_stream.start()
+		return self._depth_stream
+
+	def get_streamed_order_book(self, symbol:str):
+		"""
+		Returns a zero-copy [side][level][price, qty] view of the latest streamed book, bids first\n
+		"""
+		return self._depth_stream.get_order_book(symbol)
+
+	def stream_full_order_books(self, symbols:list) -> BinanceFuturesBookStream:
+		"""
+		Keeps an exact local replica of the full order book of each symbol from a depth snapshot and diff events\n
+		Params:
+			symbols	:	list	=	symbols to replicate. ie. ['BTCUSDT','ETHUSDT']
+		Returns:
+			The running stream, read it with get_full_order_book
+		"""
+		self._book_stream = BinanceFuturesBookStream(symbols, lambda symbol: self.client.futures_order_book(symbol=symbol, limit=1000), testnet=self.client.testnet)
+		self._book_stream.start()
+		return self._book_stream
+
+	def get_full_order_book(self, symbol:str) -> BinanceFuturesOrderBook:
+		"""
+		Returns the local book of the symbol, check is_synced before trading on it\n
+		"""
+		return self._book_stream.get_book(symbol)
+
+	def stream_mark_prices(self) -> BinanceMarkPriceStream:
+		"""
+		Streams mark price, index price and funding rate of every symbol once a second\n
+		Returns:
+			The running stream, read it with get_mark_price, get_funding_rate or get_mark_prices
+		"""
+		self._mark_price_stream = BinanceMarkPriceStream(testnet=self.client.testnet)
+		self._mark_price_stream.start()
+		return self._mark_price_stream
+
+	def get_mark_price(self, symbol:str) -> float:
+		"""
+		Returns the streamed mark price of the symbol\n
+		"""
+		return self._mark_price_stream.get_mark_price(symbol)
+
+	def get_funding_rate(self, symbol:str) -> float:
+		"""
+		Returns the streamed funding rate of the symbol\n
+		"""
+		return self._mark_price_stream.get_funding_rate(symbol)
+
+	def get_mark_prices(self, symbols:list=None) -> pd.DataFrame:
+		"""
+		Returns mark price, index price, funding rate and next funding time of many symbols at once\n
+		Params:
+			symbols	:	list	=	symbols to return, all streamed symbols by default
+		"""
+		return self._mark_price_stream.get_snapshot(symbols)
 
 	def place_order(self, symbol:str, side:str, quantity:float, order_type:str="MARKET", price:float=None, to_open:bool=True) -> str:
 		"""
@@ -93,9 +268,14 @@ class BinanceFuturesAPIREST:
 		Returns:
 			order id will be returned if order executed successfully
 		"""
-		# Setting hedge mode to open and close positions
-		positionMode = self.client.futures_get_position_mode()['dualSidePosition']
-		(not positionMode) and self.client.futures_change_position_mode(dualSidePosition=True)
+		# Rounding quantity and price to the symbol filters before it reaches the exchange
+		if to_open:
+			quantity, price = self._exchange_info.round_order(symbol, side, quantity, price if order_type.lower() == "limit" else None, order_type)
+
+		# Setting hedge mode to open and close positions, only when the cached mode differs
+		if not self._account_config.dual_side_position:
+			self.client.futures_change_position_mode(dualSidePosition=True)
+			self._account_config.dual_side_position = True
 		
 		# NOTE Placing entry order
 		body = {
@@ -116,16 +296,167 @@ class BinanceFuturesAPIREST:
 			body['reduceOnly'] = True
 			del body['quantity']
 
+		if self.ORDER_TRANSPORT == "WS":
+			return self._ws_api.place_order(body).result(self._ws_api.TIMEOUT)['orderId']
 		return self.client.futures_create_order(**body)['orderId']
 
+	def validate_orders(self, symbols:list, quantities:list, prices:list=None, sides:list=None) -> pd.DataFrame:
+		"""
+		Rounds and validates a basket of orders against the symbol filters at once\n
+		Params:
+			symbols		:	list	=	symbols of the orders
+			quantities	:	list	=	quantities of the orders
+			prices		:	list	=	limit prices, None for market orders
+			sides		:	list	=	sides of the orders. ie. buy or sell
+		Returns:
+			DataFrame with rounded quantity, price, notional, valid flag and rejection reason per order
+		"""
+		return self._exchange_info.validate_orders(symbols, quantities, prices=prices, sides=sides)
+
 	def set_leverage(self, symbol:str, leverage:int) -> None:
 		"""
 		Sets leverage\n
 		Params:
 			symbol		:	str		=	Symbol of the ticker
 			leverage	: 	int		=	Leverage to set
+		NOTE Skipped when the cached leverage already matches\n
+		"""
+		if self._account_config.leverage.get(symbol.upper()) == int(leverage):
+			return
+		response = self.client.futures_change_leverage(symbol=symbol, leverage=leverage)
+		self._account_config.leverage[symbol.upper()] = int(response['leverage'])
+
+	def set_margin_type(self, symbol:str, margin_type:str) -> None:
+		"""
+		Sets margin type\n
+		Params:
+			symbol		:	str		=	Symbol of the ticker
+			margin_type	:	str		=	ISOLATED or CROSSED
+		NOTE Skipped when the cached margin type already matches, -4046 "No need to change margin type" counts as set\n
+		"""
+		if self._account_config.margin_type.get(symbol.upper()) == margin_type.upper():
+			return
+		try:
+			self.client.futures_change_margin_type(symbol=symbol, marginType=margin_type.upper())
+		except BinanceAPIException as e:
+			if e.code != -4046:
+				raise
+		self._account_config.margin_type[symbol.upper()] = margin_type.upper()
+
+	def configure_symbols(self, leverages:dict, margin_type:str=None, max_workers:int=8) -> dict:
+		"""
+		Sets leverage and margin type of many symbols, changing only what differs from the account\n
+		Params:
+			leverages	:	dict	=	desired leverage per symbol. ie. {"BTCUSDT":10,"ETHUSDT":5}
+			margin_type	:	str		=	ISOLATED or CROSSED for every symbol, None keeps the current margin types
+			max_workers	:	int		=	symbols configured at once
+		Returns:
+			{symbol: {"leverage","margin_type","changed","code","msg"}} with the resulting configuration, changed lists what was updated
+		NOTE Current state of every symbol is read with one symbolConfig request, the changes are paced by the shared request scheduler\n
 		"""
-		self.client.futures_change_leverage(symbol=symbol, leverage=leverage)
+		self._account_config.load_positions(self.client)
+		config = self._account_config
+
+		def configure(item:tuple) -> dict:
+			symbol, leverage = item[0].upper(), int(item[1])
+			report = {"changed":[], "code":None, "msg":None}
+			try:
+				if margin_type is not None and config.margin_type.get(symbol) != margin_type.upper():
+					self.set_margin_type(symbol, margin_type)
+					report['changed'].append("margin_type")
+				if config.leverage.get(symbol) != leverage:
+					self.set_leverage(symbol, leverage)
+					report['changed'].append("leverage")
+			except Exception as e:
+				report['code'], report['msg'] = getattr(e, 'code', None), str(e)
+			report['leverage'] = config.leverage.get(symbol)
+			report['margin_type'] = config.margin_type.get(symbol)
+			return report
+
+		items = list(leverages.items())
+		if not items:
+			return {}
+		with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+			return dict(zip([symbol.upper() for symbol, _ in items], executor.map(configure, items)))
+
+	def place_orders(self, orders:list, max_workers:int=4) -> list:
+		"""
+		Places many orders through /fapi/v1/batchOrders, BATCH_ORDERS_LIMIT per request with batches sent concurrently\n
+		Params:
+			orders		:	list	=	orders as dicts of place_order params. ie. [{"symbol":"BTCUSDT","side":"buy","quantity":0.001,"order_type":"LIMIT","price":21000}]
+			max_workers	:	int		=	batches in flight at once
+		Returns:
+			One response per order in the given order, the order on success or {"code","msg"} on rejection
+		NOTE Batch orders do not accept closePosition, closing orders are sent with their quantity on the opposite position side\n
+		"""
+		if not self._account_config.dual_side_position:
+			self.client.futures_change_position_mode(dualSidePosition=True)
+			self._account_config.dual_side_position = True
+
+		results = [None] * len(orders)
+		bodies = []
+		for i, order in enumerate(orders):
+			side = order['side']
+			order_type = order.get('order_type', "MARKET")
+			price = order.get('price') if order_type.lower() == "limit" else None
+			try:
+				quantity, price = self._exchange_info.round_order(order['symbol'], side, order['quantity'], price, order_type)
+			except Exception as e:
+				results[i] = {"code":None, "msg":str(e)}
+				continue
+
+			body = {
+				"symbol":order['symbol'].upper(),
+				"side":side.upper(),
+				"positionSide":"LONG" if side.lower() == 'buy' else "SHORT",
+				"quantity":str(quantity),
+				"type":order_type.upper(),
+			}
+			if order_type.lower() == "limit":
+				body['price'] = str(price)
+				body['timeInForce'] = "GTC"
+			if not order.get('to_open', True):
+				body['positionSide'] = "LONG" if side.lower() == 'sell' else "SHORT"
+			bodies.append((i, body))
+
+		def send(batch:list) -> list:
+			try:
+				return self.client.futures_place_batch_order(batchOrders=[body for _, body in batch])
+			except Exception as e:
+				return [{"code":getattr(e, 'code', None), "msg":str(e)}] * len(batch)
+
+		batches = [bodies[i:i + self.BATCH_ORDERS_LIMIT] for i in range(0, len(bodies), self.BATCH_ORDERS_LIMIT)]
+		if batches:
+			with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+				for batch, responses in zip(batches, executor.map(send, batches)):
+					for (i, _), response in zip(batch, responses):
+						results[i] = response
+		return results
+
+	def cancel_orders(self, symbol:str, order_ids:list=None, max_workers:int=4) -> list:
+		"""
+		Cancels many orders of a symbol through /fapi/v1/batchOrders, BATCH_CANCEL_LIMIT per request with batches sent concurrently\n
+		Params:
+			symbol		:	str		=	order ticker symbol
+			order_ids	:	list	=	order ids to cancel. None cancels all open orders of the symbol
+			max_workers	:	int		=	batches in flight at once
+		Returns:
+			One response per order id, the canceled order or {"code","msg"}. The exchange response when cancelling all
+		"""
+		if order_ids is None:
+			return self.client.futures_cancel_all_open_orders(symbol=symbol)
+
+		def send(batch:list) -> list:
+			try:
+				return self.client.futures_cancel_orders(symbol=symbol, orderidlist=batch)
+			except Exception as e:
+				return [{"code":getattr(e, 'code', None), "msg":str(e)}] * len(batch)
+
+		batches = [list(order_ids[i:i + self.BATCH_CANCEL_LIMIT]) for i in range(0, len(order_ids), self.BATCH_CANCEL_LIMIT)]
+		if not batches:
+			return []
+		with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+			return [response for responses in executor.map(send, batches) for response in responses]
 
 	def cancel_order(self, symbol:str, order_id:int) -> None:
 		"""
@@ -134,7 +465,10 @@ class BinanceFuturesAPIREST:
 			symbol		:	str		=	order ticker symbol
 			order_id	:	str		=	order id to cancel
 		"""
-		self.client.futures_cancel_order(symbol=symbol, orderId=order_id)
+		if self.ORDER_TRANSPORT == "WS":
+			self._ws_api.cancel_order({"symbol":symbol, "orderId":order_id}).result(self._ws_api.TIMEOUT)
+		else:
+			self.client.futures_cancel_order(symbol=symbol, orderId=order_id)
 
 	def query_order(self, symbol:str, order_id:str) -> dict:
 		"""
@@ -142,8 +476,44 @@ class BinanceFuturesAPIREST:
 		Params:
 			symbol		:	str		=	order ticker symbol
 			order_id	:	str		=	order id to query
+		NOTE Answered from the user data stream store when running, REST on cache miss\n
+		"""
+		order = self._user_stream and self._user_stream.get_order(order_id)
+		if not order:
+			if self.ORDER_TRANSPORT == "WS":
+				order = self._ws_api.query_order({"symbol":symbol, "orderId":order_id}).result(self._ws_api.TIMEOUT)
+			else:
+				order = self.client.futures_get_order(symbol=symbol, orderId=order_id)
+			self._user_stream and self._user_stream.put_order(order)
+		return order
+
+	def sync_trades(self, symbol:str) -> list:
+		"""
+		Downloads only the fills since the last sync of the symbol\n
+		Params:
+			symbol	:	str		=	symbol. ie. BTCUSDT
+		Returns:
+			New trades oldest first, the whole history on the first sync
+		"""
+		return self._trade_sync.sync(symbol)
+
+	def sync_all_trades(self, symbols:list, max_workers:int=4) -> dict:
+		"""
+		Syncs the fills of many symbols concurrently within the request weight limits\n
+		Returns:
+			{symbol: new trades}
+		"""
+		return self._trade_sync.sync_many(symbols, max_workers=max_workers)
+
+	def start_user_stream(self) -> BinanceUserDataStream:
+		"""
+		Starts the listen key user data stream that keeps open orders, fills and balances in memory\n
+		NOTE Once running query_order and get_wallet_balance are answered locally\n
 		"""
-		return self.client.futures_get_order(symbol=symbol, orderId=order_id)
+		self._user_stream = BinanceUserDataStream(self.client.futures_stream_get_listen_key, self.client.futures_stream_keepalive, market=self.MARKET, testnet=self.client.testnet)
+		self._user_stream.add_listener(self._account_config.on_event)
+		self._user_stream.start()
+		return self._user_stream
 
 if __name__ == "__main__":
 
@@ -0,0 +1,91 @@
+# Author - Karan Parmar
+
+"""
+BINANCE KLINE BACKFILL
+
+	Splits a [start, end) range into limit-sized windows and downloads them concurrently on a bounded
+	thread pool, then merges and dedupes the pages into one contiguous frame.
+	Request weight is paced by the shared BinanceRequestScheduler attached to the client.
+"""
+
+# Importing built-in libraries
+import time, pytz
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# Importing third-party libraries
+import pandas as pd							# pip install pandas
+from binance.helpers import interval_to_milliseconds	# pip install python-binance
+
+class BinanceKlineBackfill:
+
+	COLUMNS = ['open_time','open', 'high', 'low', 'close', 'volume', 'close_time', 'qav', 'num_trades', 'taker_base_vol', 'taker_quote_vol','is_best_match']
+
+	def __init__(self, fetch, limit:int=1000, max_workers:int=4):
+		"""
+		Params:
+			fetch		:	callable	= kline endpoint. ie. client.get_klines or client.futures_klines
+			limit		:	int			= candles per request
+			max_workers	:	int			= concurrent requests in flight
+		"""
+		self.LIMIT = limit
+		self.MAX_WORKERS = max_workers
+
+		self._fetch = fetch
+
+	# Private methods
+	def _fetch_window(self, symbol:str, interval:str, start_ms:int, end_ms:int) -> list:
+		"""
+		Downloads one window of candles\n
+		"""
+		return self._fetch(symbol=symbol, interval=interval, startTime=start_ms, endTime=end_ms - 1, limit=self.LIMIT)
+
+	# Helper methods
+	@classmethod
+	def to_dataframe(cls, klines:list) -> pd.DataFrame:
+		"""
+		Converts raw klines to an OHLCV frame indexed by UTC open time\n
+		"""
+		df = pd.DataFrame(klines, columns=cls.COLUMNS)
+		df.index = [datetime.fromtimestamp(x/1000, tz=pytz.timezone('UTC')) for x in df.open_time]
+		df = df[['open', 'high', 'low', 'close', 'volume']]
+
+		df['open'] = df['open'].astype(float)
+		df['high'] = df['high'].astype(float)
+		df['low'] = df['low'].astype(float)
+		df['close'] = df['close'].astype(float)
+		df['volume'] = df['volume'].astype(float)
+
+		df.index.name = 'datetime'
+		return df
+
+	# Public methods
+	def fetch(self, symbol:str, interval:str, start_ms:int, end_ms:int=None, max_workers:int=None) -> list:
+		"""
+		Downloads all klines in [start_ms, end_ms)\n
+		Params:
+			max_workers	:	int		= overrides the concurrent requests in flight for this call
+		Returns:
+			Raw klines sorted by open time with duplicates from overlapping pages removed
+		"""
+		end_ms = end_ms or int(time.time() * 1000)
+		window_ms = self.LIMIT * interval_to_milliseconds(interval)
+		windows = [(i, min(i + window_ms, end_ms)) for i in range(start_ms, end_ms, window_ms)]
+
+		if len(windows) <= 1:
+			pages = [self._fetch_window(symbol, interval, start, end) for start, end in windows]
+		else:
+			with ThreadPoolExecutor(max_workers=min(max_workers or self.MAX_WORKERS, len(windows))) as executor:
+				pages = list(executor.map(lambda w: self._fetch_window(symbol, interval, *w), windows))
+
+		klines = {}
+		for page in pages:
+			for kline in page:
+				klines[kline[0]] = kline
+		return [klines[i] for i in sorted(klines)]
+
+	def get_candle_data(self, symbol:str, interval:str, start_ms:int, end_ms:int=None, max_workers:int=None) -> pd.DataFrame:
+		"""
+		Downloads all klines in [start_ms, end_ms) as an OHLCV frame\n
+		"""
+		return self.to_dataframe(self.fetch(symbol, interval, start_ms, end_ms, max_workers=max_workers))
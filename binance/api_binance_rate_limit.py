@@ -0,0 +1,279 @@
+# Author - Karan Parmar
+
+"""
+BINANCE REQUEST WEIGHT SCHEDULER
+
+	Paces REST calls of the SPOT, MARGIN and FUTURES adapters against Binance request weight limits.
+	Used weight is tracked from the X-MBX-USED-WEIGHT-* / X-SAPI-USED-IP-WEIGHT-* response headers and from a table of known
+	endpoint weights. Low priority calls (market data, exchange info, trade history) are held back once the minute budget
+	passes LOW_PRIORITY_SHARE so order placement always has headroom. 429/418 responses pause every call until Retry-After.
+	Order placements are also paced against the order count limits, tracked locally and synced from X-MBX-ORDER-COUNT-*.
+
+	One scheduler exists per weight bucket (api, sapi, fapi host) and is shared by every client attached in the process.
+"""
+
+# Importing built-in libraries
+import time, json
+from threading import Lock
+from urllib.parse import urlparse
+
+class BinanceRequestScheduler:
+
+	HIGH = 0
+	LOW = 1
+
+	# Share of the minute budget low priority calls may use
+	LOW_PRIORITY_SHARE = 0.6
+
+	# Weight per minute of each bucket
+	LIMITS = {
+		"api":6000,
+		"sapi":12000,
+		"fapi":2400,
+	}
+
+	# Weight per endpoint, an int or a callable of the request params. Unknown endpoints weigh 1
+	WEIGHTS = {
+		"/api/v3/exchangeInfo":20,
+		"/api/v3/klines":2,
+		"/api/v3/depth":lambda p: 5 if p.get('limit', 100) <= 100 else 25 if p.get('limit', 100) <= 500 else 50 if p.get('limit', 100) <= 1000 else 250,
+		"/api/v3/account":20,
+		"/api/v3/order":lambda p: 4 if p.get('_method') == 'get' else 1,
+		"/api/v3/openOrders":6,
+		"/api/v3/allOrders":20,
+		"/api/v3/myTrades":20,
+		"/api/v3/userDataStream":2,
+		"/sapi/v1/margin/allPairs":1,
+		"/sapi/v1/margin/account":10,
+		"/sapi/v1/margin/order":lambda p: 10 if p.get('_method') == 'get' else 6,
+		"/sapi/v1/margin/myTrades":10,
+		"/fapi/v1/exchangeInfo":1,
+		"/fapi/v1/klines":lambda p: 1 if p.get('limit', 500) < 100 else 2 if p.get('limit', 500) < 500 else 5 if p.get('limit', 500) <= 1000 else 10,
+		"/fapi/v1/depth":lambda p: 2 if p.get('limit', 500) <= 50 else 5 if p.get('limit', 500) <= 100 else 10 if p.get('limit', 500) <= 500 else 20,
+		"/fapi/v2/account":5,
+		"/fapi/v2/balance":5,
+		"/fapi/v2/positionRisk":5,
+		"/fapi/v1/symbolConfig":5,
+		"/fapi/v1/leverage":1,
+		"/fapi/v1/marginType":1,
+		"/fapi/v1/positionSide/dual":lambda p: 30 if p.get('_method') == 'get' else 1,
+		"/fapi/v1/batchOrders":lambda p: 5 if p.get('_method') == 'post' else 1,
+		"/fapi/v1/userTrades":5,
+		"/fapi/v1/allOrders":5,
+	}
+
+	# Orders per interval of each bucket, intervals as in the X-MBX-ORDER-COUNT-* headers
+	ORDER_LIMITS = {
+		"api":{"10S":100, "1D":200000},
+		"sapi":{},
+		"fapi":{"10S":300, "1M":1200},
+	}
+	INTERVALS = {
+		"S":1,
+		"M":60,
+		"H":3600,
+		"D":86400,
+	}
+
+	# Orders placed by an endpoint call, a callable of the request params
+	ORDER_COUNTS = {
+		"/api/v3/order":lambda p: 1 if p.get('_method') == 'post' else 0,
+		"/fapi/v1/order":lambda p: 1 if p.get('_method') == 'post' else 0,
+		"/fapi/v1/batchOrders":lambda p: len(json.loads(p['batchOrders'])) if p.get('_method') == 'post' and 'batchOrders' in p else 0,
+	}
+
+	# Endpoints that may wait for budget
+	LOW_PRIORITY = {
+		"/api/v3/exchangeInfo",
+		"/api/v3/klines",
+		"/api/v3/depth",
+		"/api/v3/allOrders",
+		"/api/v3/myTrades",
+		"/sapi/v1/margin/allPairs",
+		"/sapi/v1/margin/myTrades",
+		"/fapi/v1/exchangeInfo",
+		"/fapi/v1/klines",
+		"/fapi/v1/depth",
+		"/fapi/v1/userTrades",
+		"/fapi/v1/allOrders",
+	}
+
+	_schedulers = {}
+	_registry_lock = Lock()
+
+	def __init__(self, bucket:str):
+		"""
+		Params:
+			bucket	:	str		= weight bucket. ie. api.binance.com/api
+		"""
+		self.BUCKET = bucket
+		self.LIMIT = self.LIMITS[bucket.rsplit('/', 1)[-1]]
+		self.ORDER_LIMITS = self.ORDER_LIMITS[bucket.rsplit('/', 1)[-1]]
+
+		self._lock = Lock()
+		self._minute = int(time.time() // 60)
+		self.used_weight = 0
+		self.banned_until = 0
+
+		# Orders of the current window per interval. ie. {"10S":[window, count]}
+		self.order_count = {interval: [0, 0] for interval in self.ORDER_LIMITS}
+
+	# Helper methods
+	@staticmethod
+	def _get_bucket(uri:str) -> str:
+		"""
+		Returns the weight bucket of a request url\n
+		"""
+		url = urlparse(uri)
+		if url.path.startswith('/sapi'):
+			kind = "sapi"
+		elif url.path.startswith('/fapi'):
+			kind = "fapi"
+		else:
+			kind = "api"
+		return url.netloc + '/' + kind
+
+	@classmethod
+	def get(cls, uri:str) -> 'BinanceRequestScheduler':
+		"""
+		Returns the shared scheduler of the request url bucket\n
+		"""
+		bucket = cls._get_bucket(uri)
+		scheduler = cls._schedulers.get(bucket)
+		if scheduler is None:
+			with cls._registry_lock:
+				scheduler = cls._schedulers.setdefault(bucket, cls(bucket))
+		return scheduler
+
+	@classmethod
+	def get_weight(cls, path:str, method:str, params:dict) -> int:
+		"""
+		Returns the known weight of an endpoint call\n
+		"""
+		weight = cls.WEIGHTS.get(path, 1)
+		if callable(weight):
+			params = dict(params or {})
+			params['_method'] = method.lower()
+			if 'limit' in params:
+				params['limit'] = int(params['limit'])
+			weight = weight(params)
+		return weight
+
+	@classmethod
+	def get_order_count(cls, path:str, method:str, params:dict) -> int:
+		"""
+		Returns the number of orders an endpoint call places\n
+		"""
+		count = cls.ORDER_COUNTS.get(path)
+		if count is None:
+			return 0
+		params = dict(params or {})
+		params['_method'] = method.lower()
+		return count(params)
+
+	@classmethod
+	def _get_window_length(cls, interval:str) -> int:
+		"""
+		Returns the seconds of an order count interval. ie. 10S is 10\n
+		"""
+		return int(interval[:-1]) * cls.INTERVALS[interval[-1]]
+
+	@classmethod
+	def _on_response(cls, response, *args, **kwargs) -> None:
+		"""
+		requests response hook feeding the headers to the bucket scheduler\n
+		"""
+		cls.get(response.url).update(response.status_code, response.headers)
+
+	@classmethod
+	def attach(cls, client) -> None:
+		"""
+		Routes every REST call of a python-binance client through the shared schedulers\n
+		"""
+		if getattr(client, '_scheduler_attached', False):
+			return
+		request = client._request
+
+		def scheduled_request(method, uri, *args, **kwargs):
+			path = urlparse(uri).path
+			params = kwargs.get('params') or kwargs.get('data')
+			priority = cls.LOW if path in cls.LOW_PRIORITY else cls.HIGH
+			cls.get(uri).acquire(cls.get_weight(path, method, params), priority, cls.get_order_count(path, method, params))
+			return request(method, uri, *args, **kwargs)
+
+		client._request = scheduled_request
+		client.session.hooks['response'].append(cls._on_response)
+		client._scheduler_attached = True
+
+	# Private methods
+	def _roll(self, now:float) -> None:
+		"""
+		Resets the used weight at the start of every minute\n
+		"""
+		minute = int(now // 60)
+		if minute != self._minute:
+			self._minute = minute
+			self.used_weight = 0
+
+	def _roll_orders(self, now:float) -> None:
+		"""
+		Resets the order counts at the start of every window\n
+		"""
+		for interval, count in self.order_count.items():
+			window = int(now // self._get_window_length(interval))
+			if count[0] != window:
+				count[0], count[1] = window, 0
+
+	def _order_wait(self, now:float, orders:int) -> float:
+		"""
+		Returns seconds until the orders fit in every order interval, 0 when they fit now\n
+		"""
+		wait = 0
+		for interval, limit in self.ORDER_LIMITS.items():
+			if self.order_count[interval][1] + orders > limit:
+				length = self._get_window_length(interval)
+				wait = max(wait, length - now % length)
+		return wait
+
+	# Public methods
+	def acquire(self, weight:int, priority:int=HIGH, orders:int=0) -> None:
+		"""
+		Blocks until the call fits in the bucket budget and, for order placements, in the order count limits, then reserves both\n
+		"""
+		budget = self.LIMIT if priority == self.HIGH else int(self.LIMIT * self.LOW_PRIORITY_SHARE)
+		while True:
+			with self._lock:
+				now = time.time()
+				self._roll(now)
+				self._roll_orders(now)
+				order_wait = self._order_wait(now, orders) if orders else 0
+				if now >= self.banned_until and self.used_weight + weight <= budget and not order_wait:
+					self.used_weight += weight
+					for interval in self.ORDER_LIMITS:
+						self.order_count[interval][1] += orders
+					return
+				wait = max(self.banned_until - now, order_wait if order_wait else 60 - now % 60)
+			time.sleep(min(wait, 1))
+
+	def update(self, status_code:int, headers:dict) -> None:
+		"""
+		Syncs used weight and order counts from response headers, pauses the bucket on 429/418\n
+		"""
+		with self._lock:
+			now = time.time()
+			self._roll(now)
+			self._roll_orders(now)
+			for key, value in headers.items():
+				key = key.upper()
+				if key in ('X-MBX-USED-WEIGHT-1M', 'X-SAPI-USED-IP-WEIGHT-1M'):
+					# In flight reservations may not be counted by the server yet
+					self.used_weight = max(self.used_weight, int(value))
+				elif key.startswith('X-MBX-ORDER-COUNT-'):
+					count = self.order_count.get(key[len('X-MBX-ORDER-COUNT-'):])
+					if count is not None:
+						count[1] = max(count[1], int(value))
+
+			if status_code in (418, 429):
+				retry_after = int(headers.get('Retry-After', 60))
+				self.banned_until = max(self.banned_until, now + retry_after)
+				print("BINANCE_RATE_LIMITED", self.BUCKET, status_code, retry_after)
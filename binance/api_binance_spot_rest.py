@@ -4,14 +4,18 @@
 BINANCE SPOT REST API
 """
 
-# Importing built-in libraries
-import pytz 						# pip install pytz
-from datetime import datetime
-
 # Importing thid-party libraries
 import pandas as pd					# pip install pandas
 from binance.client import Client	# pip install python-binance
 
+# Importing local modules
+from api_binance_exchange_info import BinanceExchangeInfoCache
+from api_binance_klines import BinanceKlineBackfill
+from api_binance_rate_limit import BinanceRequestScheduler
+from api_binance_trades import BinanceTradeStore, BinanceTradeSync
+from api_binance_ws import BinanceKlineStream, BinanceDepthStream, BinanceUserDataStream
+from api_binance_ws_api import BinanceWSAPIClient
+
 class BinanceSPOTAPIREST:
 
 	ID = "VT_API_REST_BINANCE_SPOT"
@@ -21,21 +25,64 @@ class BinanceSPOTAPIREST:
 	BROKER = "BINANCE"
 	MARKET = "SPOT"
 
-	def __init__(self,creds:dict):
+	# Shared no-ping client for public market data when not connected to a live account
+	_public_client = None
+
+	# Local order and balance store, set by start_user_stream
+	_user_stream = None
+
+	def __init__(self, creds:dict, exchange_info_ttl:float=300, order_transport:str="REST", trade_store:str=None):
 		
 		self.CREDS = creds
+		self.EXCHANGE_INFO_TTL = exchange_info_ttl
+		self.ORDER_TRANSPORT = order_transport.upper()
+
+		# Paginated concurrent kline downloads, paced by the shared request scheduler
+		self._kline_backfill = BinanceKlineBackfill(lambda **params: self._get_public_client().get_klines(**params), limit=1000)
+
+		# Last seen trade id per symbol for incremental fill sync, one file per account
+		trade_store = trade_store or BinanceTradeStore.default_path(self.MARKET, creds['api_key'])
+		self._trade_sync = BinanceTradeSync(lambda **params: self.client.get_my_trades(**params), trade_store, limit=1000)
+
+	# Private methods
+	def _get_public_client(self) -> Client:
+		"""
+		Returns a client for public market data\n
+		NOTE Reuses the connected live session, otherwise a shared client created without the constructor ping\n
+		"""
+		client = getattr(self, 'client', None)
+		if client is not None and not client.testnet:
+			return client
+		if BinanceSPOTAPIREST._public_client is None:
+			BinanceSPOTAPIREST._public_client = Client(ping=False)
+			BinanceRequestScheduler.attach(BinanceSPOTAPIREST._public_client)
+		return BinanceSPOTAPIREST._public_client
 
 	# Public methods
-	def connect(self) -> None:
+	def connect(self, ping:bool=True) -> None:
 		"""
 		Connects to binance SPOT account\n
+		Params:
+			ping	:	bool	= ping the server while connecting. False skips the extra round trip
 		"""
 		self.client = Client(
 				api_key=self.CREDS['api_key'],
 				api_secret=self.CREDS['api_secret'],
-				testnet=True if self.CREDS['account_type'].lower() in ['testnet','sandbox','demo','test'] else False
+				testnet=True if self.CREDS['account_type'].lower() in ['testnet','sandbox','demo','test'] else False,
+				ping=ping,
 			)
 
+		# Request weight pacing shared by every Binance client in the process
+		BinanceRequestScheduler.attach(self.client)
+
+		# Orders over a persistent websocket api session instead of one signed HTTPS request each
+		if self.ORDER_TRANSPORT == "WS":
+			self._ws_api = BinanceWSAPIClient(self.CREDS['api_key'], self.CREDS['api_secret'], market=self.MARKET, testnet=self.client.testnet)
+			self._ws_api.connect()
+
+		# Symbol -> info index refreshed in the background, one per market shared by every adapter
+		self._exchange_info = BinanceExchangeInfoCache.shared("SPOT", self.client.testnet, lambda: self.client.get_exchange_info()['symbols'], ttl=self.EXCHANGE_INFO_TTL)
+
 	def get_account_info(self) -> dict:
 		"""
 		Returns account information\n
@@ -45,8 +92,13 @@ class BinanceSPOTAPIREST:
 	def get_account_balance(self, asset:str='USDT') -> float:
 		"""
 		Returns free asset balance for given asset\n
+		NOTE Answered from the user data stream store when running, REST on cache miss\n
 		"""
-		return float(self.client.get_asset_balance(asset=asset)['free'])
+		balance = self._user_stream and self._user_stream.get_balance(asset)
+		if not balance:
+			balance = self.client.get_asset_balance(asset=asset)
+			self._user_stream and self._user_stream.put_balance(asset, balance)
+		return float(balance['free'])
 
 	def get_asset_info(self, asset:str) -> dict:
 		"""
@@ -54,38 +106,73 @@ class BinanceSPOTAPIREST:
 		Params:
 			asset	:	str		= Asset to get information of. ie. BTCUSDT
 		Returns:
-
+			Symbol information served from the in-process exchange info index, refreshed every EXCHANGE_INFO_TTL seconds
 		"""
-		symbols =  self.client.get_exchange_info()['symbols']
-		for i in symbols:
-			if i['symbol'] == asset.upper():
-				return i
+		return self._exchange_info.get(asset)
 
-	def get_candle_data(self, symbol:str, timeframe:str, period:str='1d') -> pd.DataFrame:
+	def get_candle_data(self, symbol:str, timeframe:str, period:str='1d', max_workers:int=4) -> pd.DataFrame:
 		"""
 		Returns historcal klines from past for given symbol and interval\n
+		NOTE The period is split into 1000 candle windows fetched concurrently on max_workers threads\n
 		"""
 		if period[-1] == 'd':
 			pastDays = int(period[:-1])
 		start_str=str((pd.to_datetime('today')-pd.Timedelta(str(pastDays)+' days')).date())
-		df = pd.DataFrame(Client().get_historical_klines(symbol=symbol,start_str=start_str,interval=timeframe))
-		df.columns = ['open_time','open', 'high', 'low', 'close', 'volume', 'close_time', 'qav', 'num_trades', 'taker_base_vol', 'taker_quote_vol','is_best_match']
-		df.index = [datetime.fromtimestamp(x/1000, tz=pytz.timezone('UTC')) for x in df.open_time]
-		df = df[['open', 'high', 'low', 'close', 'volume']]
-		
-		df['open'] = df['open'].astype(float)
-		df['high'] = df['high'].astype(float)
-		df['low'] = df['low'].astype(float)
-		df['close'] = df['close'].astype(float)
-		df['volume'] = df['volume'].astype(float)
-		
-		df.index.name = 'datetime'
-		return df
+		start_ms = int(pd.Timestamp(start_str, tz='UTC').timestamp() * 1000)
+		return self._kline_backfill.get_candle_data(symbol=symbol, interval=timeframe, start_ms=start_ms, max_workers=max_workers)
 	
+	def stream_candle_data(self, symbols:list, timeframe:str, size:int=1000, period:str=None) -> BinanceKlineStream:
+		"""
+		Streams live klines into per symbol ring buffers\n
+		Params:
+			symbols		:	list	=	symbols to stream. ie. ['BTCUSDT','ETHUSDT']
+			timeframe	:	str		=	kline interval. ie. 1m
+			size		:	int		=	bars kept per symbol
+			period		:	str		=	seeds the buffers from get_candle_data when given. ie. 1d
+		Returns:
+			The running stream, read it with get_streamed_candle_data or stream.get_view(symbol)
+		"""
+		# Candles come from the live public endpoints like get_candle_data
+		self._kline_stream = BinanceKlineStream(symbols, timeframe, market=self.MARKET, testnet=False, size=size)
+		if period is not None:
+			for symbol in symbols:
+				self._kline_stream.seed(symbol, self.get_candle_data(symbol, timeframe, period=period))
+		self._kline_stream.start()
+		return self._kline_stream
+
+	def get_streamed_candle_data(self, symbol:str) -> pd.DataFrame:
+		"""
+		Returns the streamed candles of the symbol without downloading history again\n
+		"""
+		return self._kline_stream.get_candle_data(symbol)
+
+	def stream_order_books(self, symbols:list, levels:int=20, streams_per_connection:int=None) -> BinanceDepthStream:
+		"""
+		Streams top N depth snapshots of many symbols multiplexed over a few sockets\n
+		Params:
+			symbols					:	list	=	symbols to stream. ie. ['BTCUSDT','ETHUSDT']
+			levels					:	int		=	book depth, 5, 10 or 20
+			streams_per_connection	:	int		=	spreads the symbols over more sockets, capped by the exchange limit
+		Returns:
+			The running stream, read it with get_streamed_order_book or stream.get_top_of_books()
+		"""
+		# Market data comes from the live public endpoints like get_candle_data
+		self._depth_stream = BinanceDepthStream(symbols, levels=levels, market=self.MARKET, testnet=False, streams_per_connection=streams_per_connection)
+		self._depth_stream.start()
+		return self._depth_stream
+
+	def get_streamed_order_book(self, symbol:str):
+		"""
+		Returns a zero-copy [side][level][price, qty] view of the latest streamed book, bids first\n
+		"""
+		return self._depth_stream.get_order_book(symbol)
+
 	def place_order(self, symbol:str, side:str, quantity:float, order_type:str="MARKET", price:float=None) -> int:
 		"""
 		Places order in Binance SPOT account\n
+		NOTE Quantity and price are rounded to the symbol LOT_SIZE/PRICE_FILTER and validated locally before sending\n
 		"""
+		quantity, price = self._exchange_info.round_order(symbol, side, quantity, price if order_type.upper() == 'LIMIT' else None, order_type)
 		body = {
 			"symbol":symbol.upper(),
 			"side":side.upper(),
@@ -95,20 +182,73 @@ class BinanceSPOTAPIREST:
 		if order_type.upper() == 'LIMIT':
 			body['timeInForce'] = "GTC"
 			body['price'] = price
+		if self.ORDER_TRANSPORT == "WS":
+			return self._ws_api.place_order(body).result(self._ws_api.TIMEOUT)['orderId']
 		return self.client.create_order(**body)['orderId']
 
+	def validate_orders(self, symbols:list, quantities:list, prices:list=None, sides:list=None) -> pd.DataFrame:
+		"""
+		Rounds and validates a basket of orders against the symbol filters at once\n
+		Params:
+			symbols		:	list	= symbols of the orders
+			quantities	:	list	= quantities of the orders
+			prices		:	list	= limit prices, None for market orders
+			sides		:	list	= sides of the orders. ie. buy or sell
+		Returns:
+			DataFrame with rounded quantity, price, notional, valid flag and rejection reason per order
+		"""
+		return self._exchange_info.validate_orders(symbols, quantities, prices=prices, sides=sides)
+
 	def query_order(self, symbol:str, order_id:str) -> dict:
 		"""
 		Get order information\n
+		NOTE Answered from the user data stream store when running, REST on cache miss\n
+		"""
+		order = self._user_stream and self._user_stream.get_order(order_id)
+		if not order:
+			if self.ORDER_TRANSPORT == "WS":
+				order = self._ws_api.query_order({"symbol":symbol, "orderId":order_id}).result(self._ws_api.TIMEOUT)
+			else:
+				order = self.client.get_order(symbol=symbol, orderId=order_id)
+			self._user_stream and self._user_stream.put_order(order)
+		return order
+
+	def sync_trades(self, symbol:str) -> list:
+		"""
+		Downloads only the fills since the last sync of the symbol\n
+		Params:
+			symbol	:	str		=	symbol. ie. BTCUSDT
+		Returns:
+			New trades oldest first, the whole history on the first sync
+		"""
+		return self._trade_sync.sync(symbol)
+
+	def sync_all_trades(self, symbols:list, max_workers:int=4) -> dict:
+		"""
+		Syncs the fills of many symbols concurrently within the request weight limits\n
+		Returns:
+			{symbol: new trades}
+		"""
+		return self._trade_sync.sync_many(symbols, max_workers=max_workers)
+
+	def start_user_stream(self) -> BinanceUserDataStream:
+		"""
+		Starts the listen key user data stream that keeps open orders, fills and balances in memory\n
+		NOTE Once running query_order and get_account_balance are answered locally\n
 		"""
-		return self.client.get_order(symbol=symbol, orderId=order_id)
+		self._user_stream = BinanceUserDataStream(self.client.stream_get_listen_key, self.client.stream_keepalive, market=self.MARKET, testnet=self.client.testnet)
+		self._user_stream.start()
+		return self._user_stream
 
 	def cancel_order(self, symbol:str, order_id:str) -> None:
 		"""
 		Cancel open order\n
 		"""
 		try:
-			self.client.cancel_order(symbol=symbol, orderId=order_id)
+			if self.ORDER_TRANSPORT == "WS":
+				self._ws_api.cancel_order({"symbol":symbol, "orderId":order_id}).result(self._ws_api.TIMEOUT)
+			else:
+				self.client.cancel_order(symbol=symbol, orderId=order_id)
 		except Exception:
 			pass
 
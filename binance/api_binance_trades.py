@@ -0,0 +1,128 @@
+# Author - Karan Parmar
+
+"""
+BINANCE TRADE SYNC
+
+	Incremental download of account fills for reconciliation. The last seen trade id of every symbol is kept in a small json
+	file, each sync pages forward from it with fromId so only new fills are requested.
+	Symbols are synced concurrently, request weight is paced by the shared BinanceRequestScheduler attached to the client.
+"""
+
+# Importing built-in libraries
+import os, json, hashlib
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+class BinanceTradeStore:
+
+	# One store per file in the process, see open
+	_stores = {}
+	_stores_lock = Lock()
+
+	def __init__(self, path:str):
+		"""
+		Params:
+			path	:	str		= json file of the last seen trade id per symbol
+		"""
+		self.PATH = path
+
+		self._lock = Lock()
+		self._ids = self._read()
+
+	# Helper methods
+	@staticmethod
+	def default_path(market:str, api_key:str) -> str:
+		"""
+		Returns the default store file of an account, trade ids are global per symbol so cursors are never shared between accounts\n
+		"""
+		return f"binance_{market.lower()}_{hashlib.sha256(api_key.encode()).hexdigest()[:16]}_trades.json"
+
+	@classmethod
+	def open(cls, path:str) -> 'BinanceTradeStore':
+		"""
+		Returns the store of the file, shared by every caller in the process\n
+		"""
+		key = os.path.abspath(path)
+		with cls._stores_lock:
+			if key not in cls._stores:
+				cls._stores[key] = cls(path)
+			return cls._stores[key]
+
+	# Private methods
+	def _read(self) -> dict:
+		if not os.path.exists(self.PATH):
+			return {}
+		with open(self.PATH) as f:
+			return json.load(f)
+
+	# Public methods
+	def get(self, symbol:str) -> int:
+		return self._ids.get(symbol)
+
+	def put(self, symbol:str, trade_id:int) -> None:
+		"""
+		Saves the last seen trade id of the symbol\n
+		NOTE The file is reread and merged before it is replaced atomically, so cursors written by another process on the same
+		file are kept and a cursor never moves back\n
+		"""
+		with self._lock:
+			ids = self._read()
+			for key, value in self._ids.items():
+				ids[key] = max(value, ids.get(key, value))
+			ids[symbol] = max(trade_id, ids.get(symbol, trade_id))
+			self._ids = ids
+			temp = f"{self.PATH}.{os.getpid()}.tmp"
+			with open(temp, 'w') as f:
+				json.dump(ids, f)
+			os.replace(temp, self.PATH)
+
+class BinanceTradeSync:
+
+	def __init__(self, fetch, path:str, limit:int=1000, max_workers:int=4):
+		"""
+		Params:
+			fetch		:	callable	= trades endpoint. ie. client.get_my_trades, client.get_margin_trades or client.futures_account_trades
+			path		:	str			= json file of the last seen trade id per symbol
+			limit		:	int			= trades per request
+			max_workers	:	int			= symbols synced concurrently
+		"""
+		self.LIMIT = limit
+		self.MAX_WORKERS = max_workers
+
+		self._fetch = fetch
+		self.store = BinanceTradeStore.open(path)
+
+	# Public methods
+	def sync(self, symbol:str) -> list:
+		"""
+		Downloads the fills of the symbol after the last seen trade id\n
+		Returns:
+			New trades oldest first, the whole history on the first sync
+		NOTE The cursor moves only once every page downloaded, a failed page leaves it unchanged so the next sync downloads
+		the same fills again instead of skipping them\n
+		"""
+		symbol = symbol.upper()
+		last_id = self.store.get(symbol)
+		from_id = 0 if last_id is None else last_id + 1
+
+		trades = []
+		while True:
+			page = self._fetch(symbol=symbol, fromId=from_id, limit=self.LIMIT)
+			if not page:
+				break
+			trades.extend(page)
+			from_id = page[-1]['id'] + 1
+			if len(page) < self.LIMIT:
+				break
+		if trades:
+			self.store.put(symbol, trades[-1]['id'])
+		return trades
+
+	def sync_many(self, symbols:list, max_workers:int=None) -> dict:
+		"""
+		Syncs many symbols concurrently\n
+		Returns:
+			{symbol: new trades}
+		"""
+		with ThreadPoolExecutor(max_workers=max(1, min(max_workers or self.MAX_WORKERS, len(symbols)))) as executor:
+			return dict(zip([s.upper() for s in symbols], executor.map(self.sync, symbols)))
@@ -0,0 +1,574 @@
+# Author - Karan Parmar
+
+"""
+BINANCE WEBSOCKET STREAMS
+
+	Market and account streams for the Binance SPOT, MARGIN and FUTURES REST adapters.
+	Streams are multiplexed over combined-stream sockets, each socket is run and reconnected on its own thread.
+"""
+
+# Importing built-in libraries
+import json, time
+from threading import Thread
+
+# Importing third-party libraries
+import numpy as np							# pip install numpy
+import pandas as pd							# pip install pandas
+from websocket import WebSocketApp			# pip install websocket-client
+
+class BinanceWSAPP:
+
+	SPOT_ENDPOINT = "wss://stream.binance.com:9443"
+	SPOT_TESTNET_ENDPOINT = "wss://testnet.binance.vision"
+	FUTURES_ENDPOINT = "wss://fstream.binance.com"
+	FUTURES_TESTNET_ENDPOINT = "wss://stream.binancefuture.com"
+
+	# Binance allows 1024 streams per SPOT connection and 200 per FUTURES connection
+	MAX_STREAMS_PER_CONNECTION = {
+		"SPOT":1024,
+		"MARGIN":1024,
+		"FUTURES":200,
+	}
+
+	def __init__(self, streams:list, market:str="SPOT", testnet:bool=False, streams_per_connection:int=None):
+		"""
+		Params:
+			streams					:	list	= stream names. ie. ['btcusdt@kline_1m']
+			market					:	str		= SPOT, MARGIN or FUTURES
+			testnet					:	bool	= connect to the testnet stream endpoints
+			streams_per_connection	:	int		= spreads the streams over more sockets, capped by the exchange limit
+		"""
+		self.MARKET = market.upper()
+		self.TESTNET = testnet
+		self.STREAMS_PER_CONNECTION = min(streams_per_connection or self.MAX_STREAMS_PER_CONNECTION[self.MARKET], self.MAX_STREAMS_PER_CONNECTION[self.MARKET])
+
+		self.streams = list(streams)
+		self.WSAPPS = []
+		self._can_disconnect = False
+
+	# Private methods
+	def _get_endpoint(self) -> str:
+		"""
+		Returns the stream endpoint of the market\n
+		"""
+		if self.MARKET == "FUTURES":
+			return self.FUTURES_TESTNET_ENDPOINT if self.TESTNET else self.FUTURES_ENDPOINT
+		return self.SPOT_TESTNET_ENDPOINT if self.TESTNET else self.SPOT_ENDPOINT
+
+	def _get_urls(self) -> list:
+		"""
+		Splits the streams into combined-stream urls within the per connection stream limit\n
+		"""
+		size = self.STREAMS_PER_CONNECTION
+		return [
+			self._get_endpoint() + "/stream?streams=" + "/".join(self.streams[i:i + size])
+			for i in range(0, len(self.streams), size)
+		]
+
+	def _on_open(self, ws) -> None:
+		...
+
+	def _on_message(self, ws, raw:str) -> None:
+		"""
+		Unwraps combined-stream payloads\n
+		"""
+		message = json.loads(raw)
+		if 'stream' in message:
+			self._on_stream(message['stream'], message['data'])
+		else:
+			self._on_stream(None, message)
+
+	def _on_stream(self, stream:str, data:dict) -> None:
+		"""
+		Handles one stream event, overridden by the streams\n
+		"""
+		...
+
+	def _on_close(self, ws, close_code, close_message) -> None:
+		print("BINANCE_WS_DISCONNECTED", close_code, close_message)
+
+	def _on_error(self, ws, error) -> None:
+		print("BINANCE_WS_ERROR", error)
+
+	def _run(self, index:int) -> None:
+		"""
+		Runs one socket and reconnects it until stopped\n
+		NOTE The url is rebuilt on every reconnect so streams can refresh credentials like the listen key\n
+		"""
+		while not self._can_disconnect:
+			try:
+				url = self._get_urls()[index]
+			except Exception as e:
+				print("BINANCE_WS_ERROR", e)
+				time.sleep(5)
+				continue
+			wsapp = WebSocketApp(
+				url=url,
+				on_open=self._on_open,
+				on_message=self._on_message,
+				on_close=self._on_close,
+				on_error=self._on_error,
+			)
+			self.WSAPPS.append(wsapp)
+			wsapp.run_forever(ping_interval=60)
+			self.WSAPPS.remove(wsapp)
+			if not self._can_disconnect:
+				time.sleep(1)
+
+	# Public methods
+	def start(self) -> None:
+		"""
+		Connects all sockets\n
+		"""
+		self._can_disconnect = False
+		for index in range(len(self._get_urls())):
+			Thread(target=self._run, args=(index,), daemon=True).start()
+
+	def stop(self) -> None:
+		"""
+		Disconnects all sockets\n
+		"""
+		self._can_disconnect = True
+		for wsapp in list(self.WSAPPS):
+			wsapp.close()
+
+class BinanceKlineStream(BinanceWSAPP):
+
+	COLUMNS = ['open_time', 'open', 'high', 'low', 'close', 'volume']
+
+	def __init__(self, symbols:list, timeframe:str, market:str="SPOT", testnet:bool=False, size:int=1000):
+		"""
+		Params:
+			symbols		:	list	= symbols to stream. ie. ['BTCUSDT','ETHUSDT']
+			timeframe	:	str		= kline interval. ie. 1m
+			market		:	str		= SPOT or FUTURES
+			testnet		:	bool	= connect to the testnet stream endpoints
+			size		:	int		= bars kept per symbol
+		"""
+		super().__init__([f"{s.lower()}@kline_{timeframe}" for s in symbols], market=market, testnet=testnet)
+
+		self.SIZE = size
+		self.TIMEFRAME = timeframe
+
+		# Every bar is written twice, at i and i + size, so the latest size bars are always one contiguous slice
+		self._buffers = {s.upper(): np.full((2 * size, len(self.COLUMNS)), np.nan) for s in symbols}
+		self._counts = {s.upper(): 0 for s in symbols}
+
+	# Private methods
+	def _write(self, symbol:str, row:list) -> None:
+		"""
+		Appends a new bar or updates the open bar in place\n
+		"""
+		buffer = self._buffers[symbol]
+		count = self._counts[symbol]
+
+		if count:
+			last = (count - 1) % self.SIZE
+			if row[0] == buffer[last, 0]:
+				buffer[last] = row
+				buffer[last + self.SIZE] = row
+				return
+			if row[0] < buffer[last, 0]:
+				return
+
+		i = count % self.SIZE
+		buffer[i] = row
+		buffer[i + self.SIZE] = row
+		self._counts[symbol] = count + 1
+
+	def _on_stream(self, stream:str, data:dict) -> None:
+		kline = data['k']
+		symbol = data['s']
+		if symbol in self._buffers:
+			self._write(symbol, [kline['t'], float(kline['o']), float(kline['h']), float(kline['l']), float(kline['c']), float(kline['v'])])
+
+	# Public methods
+	def seed(self, symbol:str, df:pd.DataFrame) -> None:
+		"""
+		Seeds the buffer with historical candles from get_candle_data\n
+		"""
+		symbol = symbol.upper()
+		open_times = ((df.index - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(milliseconds=1)).to_numpy()
+		ohlcv = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=float)
+		for open_time, row in zip(open_times[-self.SIZE:], ohlcv[-self.SIZE:]):
+			self._write(symbol, [open_time, *row])
+
+	def get_view(self, symbol:str) -> np.ndarray:
+		"""
+		Returns a zero-copy view of the latest bars, oldest first\n
+		Columns:
+			open_time (ms), open, high, low, close, volume
+		NOTE The view is live and meant for immediate reads. The last row changes while the bar is open, and once the next bar
+		opens a held view gets its oldest row overwritten by it. Use get_candle_data for a frame that stays fixed\n
+		"""
+		symbol = symbol.upper()
+		count = self._counts[symbol]
+		if count <= self.SIZE:
+			return self._buffers[symbol][:count]
+		start = count % self.SIZE
+		return self._buffers[symbol][start:start + self.SIZE]
+
+	def get_candle_data(self, symbol:str) -> pd.DataFrame:
+		"""
+		Returns the latest bars as an OHLCV frame indexed by UTC open time\n
+		NOTE The frame owns a copy of the bars, later bars do not change it\n
+		"""
+		view = self.get_view(symbol).copy()
+		df = pd.DataFrame(view[:, 1:], columns=self.COLUMNS[1:], copy=False)
+		df.index = pd.to_datetime(view[:, 0], unit='ms', utc=True)
+		df.index.name = 'datetime'
+		return df
+
+class BinanceDepthStream(BinanceWSAPP):
+
+	BIDS = 0
+	ASKS = 1
+
+	def __init__(self, symbols:list, levels:int=20, market:str="SPOT", testnet:bool=False, streams_per_connection:int=None):
+		"""
+		Params:
+			symbols					:	list	= symbols to stream. ie. ['BTCUSDT','ETHUSDT']
+			levels					:	int		= partial book depth, 5, 10 or 20
+			market					:	str		= SPOT or FUTURES
+			testnet					:	bool	= connect to the testnet stream endpoints
+			streams_per_connection	:	int		= spreads the symbols over more sockets
+		"""
+		super().__init__([f"{s.lower()}@depth{levels}@100ms" for s in symbols], market=market, testnet=testnet, streams_per_connection=streams_per_connection)
+
+		self.LEVELS = levels
+		self.symbols = [s.upper() for s in symbols]
+		self.index = {s: i for i, s in enumerate(self.symbols)}
+
+		# books[symbol, buffer, side, level] = (price, qty). Snapshots are written to the inactive buffer which is then
+		# published by flipping active, readers never see a half written book and never take a lock
+		self.books = np.full((len(symbols), 2, 2, levels, 2), np.nan)
+		self.active = np.zeros(len(symbols), dtype=np.int8)
+		self.versions = np.zeros(len(symbols), dtype=np.int64)
+
+	# Private methods
+	def _write_side(self, book:np.ndarray, levels:list) -> None:
+		"""
+		Writes one side of a snapshot, missing levels are NaN\n
+		"""
+		n = min(len(levels), self.LEVELS)
+		if n:
+			book[:n] = np.array(levels[:n], dtype=float)
+		book[n:] = np.nan
+
+	def _on_stream(self, stream:str, data:dict) -> None:
+		if 's' in data:
+			symbol, bids, asks = data['s'], data['b'], data['a']
+		else:
+			symbol, bids, asks = stream.split('@', 1)[0].upper(), data['bids'], data['asks']
+
+		i = self.index.get(symbol)
+		if i is None:
+			return
+		buffer = 1 - self.active[i]
+		self._write_side(self.books[i, buffer, self.BIDS], bids)
+		self._write_side(self.books[i, buffer, self.ASKS], asks)
+		self.active[i] = buffer
+		self.versions[i] += 1
+
+	# Public methods
+	def get_order_book(self, symbol:str) -> np.ndarray:
+		"""
+		Returns a zero-copy view of the latest book of the symbol\n
+		Shape:
+			(2, levels, 2) as [side][level][price, qty], side 0 is bids best first and side 1 is asks best first
+		NOTE The view stays valid until the next snapshot of the symbol is published, compare versions to detect it\n
+		"""
+		i = self.index[symbol.upper()]
+		return self.books[i, self.active[i]]
+
+	def get_top_of_book(self, symbol:str) -> tuple:
+		"""
+		Returns (bid price, bid qty, ask price, ask qty) of the symbol\n
+		"""
+		book = self.get_order_book(symbol)
+		return book[self.BIDS, 0, 0], book[self.BIDS, 0, 1], book[self.ASKS, 0, 0], book[self.ASKS, 0, 1]
+
+	def get_top_of_books(self) -> pd.DataFrame:
+		"""
+		Returns the top of book of every symbol at once\n
+		"""
+		top = self.books[np.arange(len(self.symbols)), self.active, :, 0, :]
+		return pd.DataFrame({
+			'bid':top[:, self.BIDS, 0],
+			'bid_qty':top[:, self.BIDS, 1],
+			'ask':top[:, self.ASKS, 0],
+			'ask_qty':top[:, self.ASKS, 1],
+		}, index=self.symbols)
+
+class BinanceMarkPriceStream(BinanceWSAPP):
+
+	COLUMNS = ['mark_price', 'index_price', 'funding_rate', 'next_funding_time', 'event_time']
+
+	def __init__(self, testnet:bool=False, capacity:int=1024):
+		"""
+		Params:
+			testnet		:	bool	= connect to the testnet stream endpoints
+			capacity	:	int		= symbols preallocated, grows when the exchange lists more
+		"""
+		super().__init__(["!markPrice@arr@1s"], market="FUTURES", testnet=testnet)
+
+		# values[index[symbol]] = mark price, index price, funding rate, next funding time (ms), event time (ms)
+		self.index = {}
+		self.symbols = []
+		self.values = np.full((capacity, len(self.COLUMNS)), np.nan)
+
+	# Private methods
+	def _get_row(self, symbol:str) -> int:
+		"""
+		Returns the row of the symbol, adding it when new\n
+		"""
+		row = self.index.get(symbol)
+		if row is None:
+			row = len(self.symbols)
+			if row == len(self.values):
+				values = np.full((2 * len(self.values), len(self.COLUMNS)), np.nan)
+				values[:row] = self.values
+				self.values = values
+			self.symbols.append(symbol)
+			self.index[symbol] = row
+		return row
+
+	def _on_stream(self, stream:str, data:list) -> None:
+		rows = [self._get_row(e['s']) for e in data]
+		self.values[rows] = np.array([[e['p'], e['i'], e['r'], e['T'], e['E']] for e in data], dtype=float)
+
+	# Public methods
+	def get(self, symbol:str) -> np.ndarray:
+		"""
+		Returns [mark price, index price, funding rate, next funding time, event time] of the symbol, NaN when not received yet\n
+		"""
+		row = self.index.get(symbol.upper())
+		if row is None:
+			return np.full(len(self.COLUMNS), np.nan)
+		return self.values[row]
+
+	def get_mark_price(self, symbol:str) -> float:
+		return self.get(symbol)[0]
+
+	def get_index_price(self, symbol:str) -> float:
+		return self.get(symbol)[1]
+
+	def get_funding_rate(self, symbol:str) -> float:
+		return self.get(symbol)[2]
+
+	def get_next_funding_time(self, symbol:str) -> float:
+		return self.get(symbol)[3]
+
+	def get_snapshot(self, symbols:list=None) -> pd.DataFrame:
+		"""
+		Returns a copy of the values of the symbols, all received symbols by default\n
+		"""
+		n = len(self.symbols)
+		df = pd.DataFrame(self.values[:n].copy(), columns=self.COLUMNS, index=self.symbols[:n])
+		if symbols is not None:
+			df = df.reindex([s.upper() for s in symbols])
+		return df
+
+class BinanceUserDataStream(BinanceWSAPP):
+
+	KEEPALIVE_INTERVAL = 30 * 60
+
+	def __init__(self, get_listen_key, keepalive, market:str="SPOT", testnet:bool=False):
+		"""
+		Params:
+			get_listen_key	:	callable	= creates the listen key. ie. client.stream_get_listen_key
+			keepalive		:	callable	= extends the listen key. ie. client.stream_keepalive
+			market			:	str			= SPOT, MARGIN or FUTURES
+			testnet			:	bool		= connect to the testnet stream endpoints
+		"""
+		super().__init__([], market=market, testnet=testnet)
+
+		self._get_listen_key = get_listen_key
+		self._keepalive = keepalive
+
+		self.listen_key = None
+		self.is_live = False
+
+		# Local store kept current from the stream
+		self.orders = {}
+		self.client_order_ids = {}
+		self.fills = []
+		self.balances = {}
+
+		# Callables receiving every raw event, see add_listener
+		self._listeners = []
+
+	# Private methods
+	def _get_urls(self) -> list:
+		"""
+		Returns the raw stream url of a fresh or extended listen key\n
+		"""
+		self.listen_key = self._get_listen_key()
+		return [self._get_endpoint() + "/ws/" + self.listen_key]
+
+	def _start_keepalive(self) -> None:
+		"""
+		Extends the listen key every KEEPALIVE_INTERVAL seconds\n
+		"""
+		def keepalive():
+			while not self._can_disconnect:
+				time.sleep(self.KEEPALIVE_INTERVAL)
+				try:
+					self._keepalive(listenKey=self.listen_key)
+				except Exception as e:
+					print("BINANCE_WS_KEEPALIVE_ERROR", e)
+
+		Thread(target=keepalive, daemon=True).start()
+
+	def _on_open(self, ws) -> None:
+		"""
+		Events missed while disconnected are lost, start from an empty store\n
+		"""
+		self.orders.clear()
+		self.client_order_ids.clear()
+		self.balances.clear()
+		self.is_live = True
+
+	def _on_close(self, ws, close_code, close_message) -> None:
+		self.is_live = False
+		super()._on_close(ws, close_code, close_message)
+
+	def _on_stream(self, stream:str, data:dict) -> None:
+		event = data.get('e')
+		for listener in self._listeners:
+			listener(data)
+
+
+		# SPOT and MARGIN
+		if event == 'executionReport':
+			self._on_order({
+				"symbol":data['s'],
+				"orderId":data['i'],
+				"orderListId":data.get('g'),
+				"clientOrderId":data['C'] if data['X'] == 'CANCELED' and data.get('C') else data['c'],
+				"price":data['p'],
+				"origQty":data['q'],
+				"executedQty":data['z'],
+				"cummulativeQuoteQty":data['Z'],
+				"status":data['X'],
+				"timeInForce":data['f'],
+				"type":data['o'],
+				"side":data['S'],
+				"stopPrice":data['P'],
+				"icebergQty":data['F'],
+				"time":data['O'],
+				"updateTime":data['T'],
+				"isWorking":data['w'],
+				"origQuoteOrderQty":data['Q'],
+			}, data['x'], data['L'], data['l'], data['n'], data['N'], data['t'], data['T'])
+
+		elif event == 'outboundAccountPosition':
+			for balance in data['B']:
+				self.balances[balance['a']] = {"asset":balance['a'], "free":balance['f'], "locked":balance['l']}
+
+		# FUTURES
+		elif event == 'ORDER_TRADE_UPDATE':
+			order = data['o']
+			self._on_order({
+				"symbol":order['s'],
+				"orderId":order['i'],
+				"clientOrderId":order['c'],
+				"price":order['p'],
+				"avgPrice":order['ap'],
+				"origQty":order['q'],
+				"executedQty":order['z'],
+				"status":order['X'],
+				"timeInForce":order['f'],
+				"type":order['o'],
+				"origType":order['ot'],
+				"side":order['S'],
+				"positionSide":order['ps'],
+				"stopPrice":order['sp'],
+				"closePosition":order['cp'],
+				"reduceOnly":order['R'],
+				"workingType":order['wt'],
+				"updateTime":order['T'],
+			}, order['x'], order['L'], order['l'], order.get('n'), order.get('N'), order['t'], order['T'])
+
+		elif event == 'ACCOUNT_UPDATE':
+			for balance in data['a']['B']:
+				self.balances[balance['a']] = {"asset":balance['a'], "balance":balance['wb'], "crossWalletBalance":balance['cw']}
+
+		elif event == 'listenKeyExpired':
+			# Reconnecting creates a new listen key
+			for wsapp in list(self.WSAPPS):
+				wsapp.close()
+
+	def _on_order(self, order:dict, execution_type:str, price:str, quantity:str, commission:str, commission_asset:str, trade_id:int, trade_time:int) -> None:
+		"""
+		Stores the latest order state and records fills\n
+		"""
+		self.orders[order['orderId']] = order
+		self.client_order_ids[order['clientOrderId']] = order['orderId']
+
+		if execution_type == 'TRADE':
+			self.fills.append({
+				"symbol":order['symbol'],
+				"orderId":order['orderId'],
+				"tradeId":trade_id,
+				"side":order['side'],
+				"price":price,
+				"qty":quantity,
+				"commission":commission,
+				"commissionAsset":commission_asset,
+				"time":trade_time,
+			})
+
+	# Public methods
+	def start(self) -> None:
+		"""
+		Connects the stream and starts the listen key keepalive\n
+		"""
+		super().start()
+		self._start_keepalive()
+
+	def add_listener(self, listener) -> None:
+		"""
+		Registers a callable that receives every raw user data event\n
+		"""
+		self._listeners.append(listener)
+
+	def get_order(self, order_id) -> dict:
+		"""
+		Returns the locally stored order by order id or client order id, None on cache miss\n
+		"""
+		if not self.is_live:
+			return None
+		order = self.orders.get(order_id)
+		if order is None:
+			order = self.orders.get(self.client_order_ids.get(order_id))
+		if order is None and str(order_id).isdigit():
+			order = self.orders.get(int(order_id))
+		return order
+
+	def put_order(self, order:dict) -> None:
+		"""
+		Stores an order fetched over REST, the stream keeps it current from now on\n
+		NOTE A stored order with the same or a later updateTime is kept, the REST read may predate an event already received\n
+		"""
+		if self.is_live and order:
+			stored = self.orders.get(order['orderId'])
+			if stored is not None and stored.get('updateTime', 0) >= order.get('updateTime', 0):
+				return
+			self.orders[order['orderId']] = order
+			self.client_order_ids[order['clientOrderId']] = order['orderId']
+
+	def get_balance(self, asset:str) -> dict:
+		"""
+		Returns the locally stored balance of the asset, None on cache miss\n
+		"""
+		if not self.is_live:
+			return None
+		return self.balances.get(asset.upper())
+
+	def put_balance(self, asset:str, balance:dict) -> None:
+		"""
+		Stores a balance fetched over REST\n
+		"""
+		if self.is_live and balance:
+			self.balances[asset.upper()] = balance
@@ -0,0 +1,187 @@
+# Author - Karan Parmar
+
+"""
+BINANCE WEBSOCKET API
+
+	Order entry over a persistent authenticated session on the Binance WebSocket API instead of one signed HTTPS request per order.
+	Requests are correlated with responses by id and returned as futures, callbacks can be attached with Future.add_done_callback.
+"""
+
+# Importing built-in libraries
+import json, time
+import hmac, hashlib
+from itertools import count
+from threading import Thread, Event, Lock
+from urllib.parse import urlencode
+from concurrent.futures import Future
+
+# Importing third-party libraries
+from websocket import WebSocketApp			# pip install websocket-client
+
+class BinanceWSAPIClient:
+
+	SPOT_ENDPOINT = "wss://ws-api.binance.com:443/ws-api/v3"
+	SPOT_TESTNET_ENDPOINT = "wss://ws-api.testnet.binance.vision/ws-api/v3"
+	FUTURES_ENDPOINT = "wss://ws-fapi.binance.com/ws-fapi/v1"
+	FUTURES_TESTNET_ENDPOINT = "wss://testnet.binancefuture.com/ws-fapi/v1"
+
+	def __init__(self, api_key:str, api_secret:str, market:str="SPOT", testnet:bool=False, url:str=None, timeout:float=10):
+		"""
+		Params:
+			api_key		:	str		= api key
+			api_secret	:	str		= api secret
+			market		:	str		= SPOT or FUTURES
+			testnet		:	bool	= connect to the testnet endpoints
+			url			:	str		= overrides the endpoint. ie. a local stand-in server
+			timeout		:	float	= seconds to wait for the connection and for responses
+		"""
+		self.API_KEY = api_key
+		self.MARKET = market.upper()
+		self.TIMEOUT = timeout
+
+		if url is not None:
+			self.url = url
+		elif self.MARKET == "FUTURES":
+			self.url = self.FUTURES_TESTNET_ENDPOINT if testnet else self.FUTURES_ENDPOINT
+		else:
+			self.url = self.SPOT_TESTNET_ENDPOINT if testnet else self.SPOT_ENDPOINT
+
+		# Keyed HMAC computed once, copied for every signature
+		self._hmac = hmac.new(api_secret.encode('utf-8'), digestmod=hashlib.sha256)
+
+		self.WSAPP = None
+		self._ids = count(1)
+		self._pending = {}
+		self._send_lock = Lock()
+		self._is_connected = Event()
+		self._can_disconnect = False
+
+	# Helper methods
+	@staticmethod
+	def _to_param(value) -> str:
+		"""
+		Converts a parameter to the string form used in the signature payload\n
+		"""
+		if isinstance(value, bool):
+			return "true" if value else "false"
+		return str(value)
+
+	# Private methods
+	def _sign(self, params:dict) -> dict:
+		"""
+		Adds apiKey, timestamp and signature to the request params\n
+		"""
+		params = {k: self._to_param(v) for k, v in params.items() if v is not None}
+		params['apiKey'] = self.API_KEY
+		params['timestamp'] = str(int(time.time() * 1000))
+		signature = self._hmac.copy()
+		signature.update(urlencode(sorted(params.items())).encode('utf-8'))
+		params['signature'] = signature.hexdigest()
+		return params
+
+	def _on_open(self, ws) -> None:
+		self._is_connected.set()
+
+	def _on_message(self, ws, raw:str) -> None:
+		"""
+		Resolves the pending request of the response id\n
+		"""
+		message = json.loads(raw)
+		future = self._pending.pop(message.get('id'), None)
+		if future is None:
+			return
+		if message.get('status') == 200:
+			future.set_result(message['result'])
+		else:
+			error = message.get('error', {})
+			future.set_exception(Exception("{}-{}".format(error.get('code'), error.get('msg'))))
+
+	def _on_close(self, ws, close_code, close_message) -> None:
+		"""
+		Fails every pending request, their outcome is unknown\n
+		"""
+		self._is_connected.clear()
+		pending, self._pending = self._pending, {}
+		for future in pending.values():
+			future.set_exception(Exception(f"websocket closed before response, {close_code} {close_message}"))
+
+	def _on_error(self, ws, error) -> None:
+		print("BINANCE_WS_API_ERROR", error)
+
+	def _run(self) -> None:
+		"""
+		Runs the socket and reconnects it until disconnected\n
+		"""
+		while not self._can_disconnect:
+			self.WSAPP = WebSocketApp(
+				url=self.url,
+				on_open=self._on_open,
+				on_message=self._on_message,
+				on_close=self._on_close,
+				on_error=self._on_error,
+			)
+			self.WSAPP.run_forever(ping_interval=60)
+			if not self._can_disconnect:
+				time.sleep(1)
+
+	# Public methods
+	def connect(self) -> None:
+		"""
+		Opens the session and waits until it is ready\n
+		"""
+		self._can_disconnect = False
+		Thread(target=self._run, daemon=True).start()
+		if not self._is_connected.wait(self.TIMEOUT):
+			raise Exception(f"could not connect to {self.url}")
+
+	def disconnect(self) -> None:
+		"""
+		Closes the session\n
+		"""
+		self._can_disconnect = True
+		self.WSAPP and self.WSAPP.close()
+
+	def request(self, method:str, params:dict, signed:bool=True) -> Future:
+		"""
+		Sends a request and returns a future of its result\n
+		Params:
+			method	:	str		= websocket api method. ie. order.place
+			params	:	dict	= request params
+			signed	:	bool	= sign the request with the api key
+		"""
+		if not self._is_connected.wait(self.TIMEOUT):
+			raise Exception(f"not connected to {self.url}")
+
+		request_id = str(next(self._ids))
+		future = Future()
+		self._pending[request_id] = future
+		body = json.dumps({
+			"id":request_id,
+			"method":method,
+			"params":self._sign(params) if signed else params,
+		})
+		try:
+			with self._send_lock:
+				self.WSAPP.send(body)
+		except Exception as e:
+			self._pending.pop(request_id, None)
+			future.set_exception(e)
+		return future
+
+	def place_order(self, params:dict) -> Future:
+		"""
+		order.place, resolves to the order response\n
+		"""
+		return self.request("order.place", params)
+
+	def cancel_order(self, params:dict) -> Future:
+		"""
+		order.cancel, resolves to the cancelled order\n
+		"""
+		return self.request("order.cancel", params)
+
+	def query_order(self, params:dict) -> Future:
+		"""
+		order.status, resolves to the order\n
+		"""
+		return self.request("order.status", params)
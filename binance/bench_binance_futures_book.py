@@ -0,0 +1,97 @@
+# Author - Karan Parmar
+
+"""
+BINANCE FUTURES ORDER BOOK REPLAY BENCHMARK
+
+	Replays a recorded diff stream through BinanceFuturesOrderBook and reports updates per second.
+	A recording is a JSON lines file, the first line is the REST depth snapshot and every next line a depthUpdate event.
+	Without a recording a synthetic stream updating levels around a fixed mid price is generated.
+
+	Run from this directory:
+		python bench_binance_futures_book.py record BTCUSDT 60 btcusdt.jsonl		records 60 seconds of the live stream
+		python bench_binance_futures_book.py replay btcusdt.jsonl				replays a recording
+		python bench_binance_futures_book.py [events]							replays a synthetic stream
+"""
+
+# Importing built-in libraries
+import sys, json, time, random
+
+# Importing third-party libraries
+from binance.client import Client	# pip install python-binance
+
+# Importing local modules
+from api_binance_futures_book import BinanceFuturesOrderBook
+from api_binance_ws import BinanceWSAPP
+
+class Recorder(BinanceWSAPP):
+
+	def __init__(self, symbol:str, path:str):
+		super().__init__([f"{symbol.lower()}@depth@100ms"], market="FUTURES")
+		self.symbol = symbol.upper()
+		self.file = open(path, 'w')
+		self.events = 0
+
+	def _on_stream(self, stream:str, data:dict) -> None:
+		# Snapshot is taken after the first event so the recording starts buffered like the live book
+		if not self.events:
+			self.file.write(json.dumps(Client(ping=False).futures_order_book(symbol=self.symbol, limit=1000)) + "\n")
+		self.file.write(json.dumps(data) + "\n")
+		self.events += 1
+
+def synthetic(n:int, levels:int=1000, seed:int=7) -> list:
+	"""
+	Returns a snapshot and n chained events updating levels around the mid price\n
+	"""
+	rng = random.Random(seed)
+	mid, tick = 30000.0, 0.1
+	snapshot = {
+		'lastUpdateId':100,
+		'bids':[[f"{mid - tick * i:.1f}", "1.000"] for i in range(1, levels + 1)],
+		'asks':[[f"{mid + tick * i:.1f}", "1.000"] for i in range(1, levels + 1)],
+	}
+	# Stream starts before the snapshot so the first event straddles lastUpdateId
+	events, u = [snapshot], 95
+	for _ in range(n):
+		count = rng.randint(5, 30)
+		b = [[f"{mid - tick * int(rng.expovariate(0.05) + 1):.1f}", f"{rng.choice((0, rng.random() * 5)):.3f}"] for _ in range(count)]
+		a = [[f"{mid + tick * int(rng.expovariate(0.05) + 1):.1f}", f"{rng.choice((0, rng.random() * 5)):.3f}"] for _ in range(count)]
+		events.append({'e':'depthUpdate', 'E':0, 's':'BTCUSDT', 'U':u + 1, 'u':u + count, 'pu':u, 'b':b, 'a':a})
+		u += count
+	return events
+
+def replay(snapshot:dict, events:list) -> None:
+	book = BinanceFuturesOrderBook(events[0].get('s', 'BTCUSDT') if events else 'BTCUSDT')
+	book.load_snapshot(snapshot)
+	levels = sum(len(e['b']) + len(e['a']) for e in events)
+
+	start = time.perf_counter()
+	for i, event in enumerate(events):
+		if not book.apply(event):
+			print("gap at event", i, "the recording cannot be replayed further")
+			events = events[:i]
+			break
+	elapsed = time.perf_counter() - start
+
+	print(f"events {len(events)}   levels {levels}   resyncs {book.resyncs}   {elapsed:.3f}s")
+	print(f"events/s {len(events) / elapsed:>12.0f}   level updates/s {levels / elapsed:>12.0f}")
+	print("best bid", book.get_best_bid(), "best ask", book.get_best_ask(), "depth", len(book.bids), len(book.asks))
+
+if __name__ == "__main__":
+
+	if len(sys.argv) > 1 and sys.argv[1] == "record":
+		symbol, seconds, path = sys.argv[2], float(sys.argv[3]), sys.argv[4]
+		recorder = Recorder(symbol, path)
+		recorder.start()
+		time.sleep(seconds)
+		recorder.stop()
+		recorder.file.close()
+		print("recorded", recorder.events, "events to", path)
+
+	elif len(sys.argv) > 1 and sys.argv[1] == "replay":
+		with open(sys.argv[2]) as f:
+			lines = [json.loads(line) for line in f if line.strip()]
+		replay(lines[0], lines[1:])
+
+	else:
+		lines = synthetic(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
+		replay(lines[0], lines[1:])
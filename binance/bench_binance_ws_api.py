@@ -0,0 +1,148 @@
+# Author - Karan Parmar
+
+"""
+BINANCE ORDER TRANSPORT BENCHMARK
+
+	Compares order placement latency of the REST transport (python-binance Client) against the WebSocket API transport
+	(BinanceWSAPIClient) on local stand-in servers, so only client side and protocol overhead is measured.
+
+	Run from this directory:
+		python bench_binance_ws_api.py [orders]
+"""
+
+# Importing built-in libraries
+import sys, json, time, struct, base64, hashlib, socket, statistics
+from threading import Thread
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingTCPServer, StreamRequestHandler
+
+# Importing third-party libraries
+from binance.client import Client	# pip install python-binance
+
+# Importing local modules
+from api_binance_ws_api import BinanceWSAPIClient
+
+ORDER = {"symbol":"BTCUSDT", "orderId":1, "status":"NEW"}
+
+class RESTStandIn(BaseHTTPRequestHandler):
+
+	protocol_version = "HTTP/1.1"
+
+	def setup(self):
+		super().setup()
+		self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+	def do_POST(self):
+		self.rfile.read(int(self.headers.get('Content-Length', 0)))
+		body = json.dumps(ORDER).encode()
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		...
+
+class WSStandIn(StreamRequestHandler):
+	"""
+	Minimal RFC 6455 server answering every text frame with a WebSocket API success response\n
+	"""
+	GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+	def _read_frame(self):
+		header = self.rfile.read(2)
+		if len(header) < 2:
+			return None, None
+		opcode, length = header[0] & 0x0F, header[1] & 0x7F
+		if length == 126:
+			length = struct.unpack(">H", self.rfile.read(2))[0]
+		elif length == 127:
+			length = struct.unpack(">Q", self.rfile.read(8))[0]
+		mask = self.rfile.read(4)
+		payload = bytearray(self.rfile.read(length))
+		for i in range(length):
+			payload[i] ^= mask[i % 4]
+		return opcode, bytes(payload)
+
+	def _send_frame(self, payload:bytes, opcode:int=0x1):
+		header = bytes([0x80 | opcode])
+		if len(payload) < 126:
+			header += bytes([len(payload)])
+		elif len(payload) < 65536:
+			header += bytes([126]) + struct.pack(">H", len(payload))
+		else:
+			header += bytes([127]) + struct.pack(">Q", len(payload))
+		self.wfile.write(header + payload)
+
+	def handle(self):
+		self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		headers = {}
+		while True:
+			line = self.rfile.readline().decode().strip()
+			if not line:
+				break
+			if ':' in line:
+				key, value = line.split(':', 1)
+				headers[key.strip().lower()] = value.strip()
+		accept = base64.b64encode(hashlib.sha1((headers['sec-websocket-key'] + self.GUID).encode()).digest()).decode()
+		self.wfile.write(f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n".encode())
+
+		while True:
+			opcode, payload = self._read_frame()
+			if opcode is None or opcode == 0x8:
+				break
+			if opcode == 0x9:
+				self._send_frame(payload, 0xA)
+			elif opcode == 0x1:
+				request = json.loads(payload)
+				self._send_frame(json.dumps({"id":request['id'], "status":200, "result":ORDER}).encode())
+
+def percentile(values:list, p:float) -> float:
+	values = sorted(values)
+	return values[min(len(values) - 1, int(len(values) * p))]
+
+def report(name:str, latencies:list, elapsed:float) -> None:
+	print(f"{name:<6} orders/s {len(latencies) / elapsed:>9.0f}   p50 {percentile(latencies, 0.5) * 1e6:>7.0f}us   p99 {percentile(latencies, 0.99) * 1e6:>7.0f}us   mean {statistics.mean(latencies) * 1e6:>7.0f}us")
+
+if __name__ == "__main__":
+
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+	body = {"symbol":"BTCUSDT", "side":"BUY", "type":"LIMIT", "timeInForce":"GTC", "quantity":"0.001", "price":"20000"}
+
+	rest_server = ThreadingHTTPServer(("127.0.0.1", 0), RESTStandIn)
+	Thread(target=rest_server.serve_forever, daemon=True).start()
+	ThreadingTCPServer.allow_reuse_address = True
+	ws_server = ThreadingTCPServer(("127.0.0.1", 0), WSStandIn)
+	ws_server.daemon_threads = True
+	Thread(target=ws_server.serve_forever, daemon=True).start()
+
+	# REST, one signed HTTP request per order on a keep-alive session
+	client = Client("key", "secret", ping=False)
+	client.API_URL = f"http://127.0.0.1:{rest_server.server_port}/api"
+	latencies = []
+	start = time.perf_counter()
+	for _ in range(n):
+		t = time.perf_counter()
+		client.create_order(**body)
+		latencies.append(time.perf_counter() - t)
+	report("REST", latencies, time.perf_counter() - start)
+
+	# WS, signed requests on the persistent session
+	ws_api = BinanceWSAPIClient("key", "secret", url=f"ws://127.0.0.1:{ws_server.server_address[1]}")
+	ws_api.connect()
+	latencies = []
+	start = time.perf_counter()
+	for _ in range(n):
+		t = time.perf_counter()
+		ws_api.place_order(body).result()
+		latencies.append(time.perf_counter() - t)
+	report("WS", latencies, time.perf_counter() - start)
+
+	# WS pipelined, requests in flight at once correlated by id
+	start = time.perf_counter()
+	futures = [ws_api.place_order(body) for _ in range(n)]
+	[f.result() for f in futures]
+	elapsed = time.perf_counter() - start
+	print(f"WS pipelined orders/s {n / elapsed:>9.0f}")
+	ws_api.disconnect()
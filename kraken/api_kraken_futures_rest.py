@@ -8,6 +8,7 @@ Kucoin FUTURES REST API
 import json, time, pytz
 from datetime import datetime
 import hmac, base64, hashlib
+from itertools import count
 from urllib.parse import urlencode
 
 # Importing third-party libraries
@@ -24,10 +25,21 @@ class KrakenFuturesAPIREST:
 
 	TIMEZONE = "UTC"
 
+	ORDER_TYPES = {
+		"MARKET":"mkt",
+		"LIMIT":"lmt",
+		"STOP":"stp",
+		"POST":"post",
+		"IOC":"ioc",
+		"TAKE_PROFIT":"take_profit",
+	}
+
 	LIVE_ENDPOINT = 'https://futures.kraken.com/derivatives'
 	SANDBOX_ENDPOINT = 'https://demo-futures.kraken.com/derivatives'
 
-	nonce = 0
+	# Strictly increasing nonces shared by every instance and thread, next() on a count is atomic so no lock is taken
+	# NOTE Seeded in microseconds so nonces stay above the ones of previous runs
+	_nonces = count(time.time_ns() // 1000)
 
 	def __init__(self, creds:dict):
 		
@@ -38,17 +50,21 @@ class KrakenFuturesAPIREST:
 		else:
 			self.url = self.LIVE_ENDPOINT
 
+		# Keyed HMAC computed once, copied for every signature
+		self._hmac = hmac.new(base64.b64decode(self.CREDS['private_key']), digestmod=hashlib.sha512)
+
 	# Private methods
-	def _get_nonce(self):
-		return int(1000 * time.time())
+	def _get_nonce(self) -> str:
+		return str(next(KrakenFuturesAPIREST._nonces))
 
-	def _sign_message(self, data:dict, urlpath:str):
+	def _sign_message(self, post_data:str, nonce:str, urlpath:str) -> str:
 
-		# step 1: concatenate postData, nonce + endpoint
-		encoded = (urlencode(data) + str(data["nonce"])).encode()
-		message =  hashlib.sha256(encoded).digest() + urlpath.encode()
+		# step 1: concatenate postData, nonce + endpoint and hash it with SHA-256
+		message = hashlib.sha256((post_data + nonce + urlpath).encode()).digest()
 
-		signature = hmac.new(base64.b64decode(self.CREDS['private_key']), message, hashlib.sha512)
+		# step 2: HMAC-SHA512 of the hash keyed with the base64 decoded api secret
+		signature = self._hmac.copy()
+		signature.update(message)
 		sigdigest = base64.b64encode(signature.digest())
 
 		return sigdigest.decode()
@@ -59,20 +75,28 @@ class KrakenFuturesAPIREST:
 		"""
 		return requests.request(method, self.url + endpoint, params=params).json()
 
-	def _private_request(self, method:str, endpoint:str, data:dict={}) -> dict:
+	def _private_request(self, method:str, endpoint:str, data:dict=None) -> dict:
 		"""
 		Send a private request to interact with connected account\n
+		Params:
+			data	:	dict	= form fields, or an already encoded post body
+		NOTE Every call encodes its own payload and nonce, calls can run concurrently from many threads\n
 		"""
-		data["nonce"] = self._get_nonce()
+		post_data = data if isinstance(data, str) else urlencode(data or {})
+		nonce = self._get_nonce()
 
-		sign = self._sign_message(data, endpoint)
+		sign = self._sign_message(post_data, nonce, endpoint)
 		
 		headers = {
 			"APIKey":self.CREDS['public_key'],
+			"Nonce":nonce,
 			"Authent":sign
 		}
-		
-		return requests.request(method, self.url + endpoint, data=data, headers=headers)
+
+		if method == "GET":
+			return requests.request(method, self.url + endpoint + ('?' + post_data if post_data else ''), headers=headers)
+		headers["Content-Type"] = "application/x-www-form-urlencoded"
+		return requests.request(method, self.url + endpoint, data=post_data, headers=headers)
 
 	# Public methods
 	def connect(self) -> None:
@@ -201,6 +225,113 @@ class KrakenFuturesAPIREST:
 		endpoint = f"/api/v1/orders/{order_id}"
 		self._request(method, endpoint)
 
+	def send_batch(self, instructions:list) -> list:
+		"""
+		Sends many send, cancel and edit instructions in one signed /api/v3/batchorder request\n
+		Params:
+			instructions	:	list	= batchOrder elements. ie. [{"order":"send","orderType":"lmt","symbol":"PF_XBTUSD","side":"buy","size":1,"limitPrice":30000},{"order":"cancel","order_id":"..."},{"order":"edit","order_id":"...","limitPrice":30100}]
+		Returns:
+			One batchStatus element per instruction in the given order, None when the exchange reported nothing for it
+		NOTE Values containing & + or % are refused, use plain client order ids\n
+		"""
+		# Sends are matched back by order_tag, tags given by the caller are kept and the others get their list index
+		instructions = [dict(instruction) for instruction in instructions]
+		for i, instruction in enumerate(instructions):
+			if instruction['order'] == 'send' and instruction.get('order_tag') is None:
+				instruction['order_tag'] = str(i)
+		tags = [str(instruction['order_tag']) for instruction in instructions if instruction['order'] == 'send']
+		if len(tags) != len(set(tags)):
+			raise Exception(f"order_tag must be unique within a batch, {tags}")
+
+		# The batch is sent as a raw json form field, encoded the same way in the body and the signature
+		# NOTE Form decoding would split or alter the json at these characters, such values are refused instead of sent
+		batch = json.dumps({"batchOrder":instructions}, separators=(',', ':'))
+		unsafe = [c for c in "&+%" if c in batch]
+		if unsafe:
+			raise Exception(f"batch values cannot contain {' '.join(unsafe)}, {batch}")
+		post_data = "json=" + batch
+		response = self._private_request("POST", "/api/v3/batchorder", post_data).json()
+		if response.get('result') != 'success':
+			raise Exception(response)
+
+		statuses = response.get('batchStatus', [])
+		by_tag = {str(status['order_tag']): status for status in statuses if status.get('order_tag') is not None}
+		by_order_id = {status['order_id']: status for status in statuses if status.get('order_id') is not None}
+		by_cli_ord_id = {status['cliOrdId']: status for status in statuses if status.get('cliOrdId') is not None}
+
+		results = []
+		for instruction in instructions:
+			if instruction['order'] == 'send':
+				results.append(by_tag.get(str(instruction['order_tag'])))
+			else:
+				results.append(by_order_id.get(instruction.get('order_id')) or by_cli_ord_id.get(instruction.get('cliOrdId')))
+		return results
+
+	def place_orders(self, orders:list) -> list:
+		"""
+		Places many orders in one batch request\n
+		Params:
+			orders	:	list	=	orders as dicts. ie. [{"symbol":"PF_XBTUSD","side":"buy","quantity":1,"order_type":"LIMIT","price":30000,"client_order_id":"q1","reduce_only":False}]
+		Returns:
+			One batchStatus element per order with status (placed or the rejection reason) and order_id
+		"""
+		instructions = []
+		for order in orders:
+			instruction = {
+				"order":"send",
+				"orderType":self.ORDER_TYPES[order.get('order_type', "MARKET").upper()],
+				"symbol":order['symbol'],
+				"side":order['side'].lower(),
+				"size":order['quantity'],
+			}
+			if order.get('price') is not None:
+				instruction['limitPrice'] = order['price']
+			if order.get('stop_price') is not None:
+				instruction['stopPrice'] = order['stop_price']
+			if order.get('client_order_id') is not None:
+				instruction['cliOrdId'] = order['client_order_id']
+			if order.get('reduce_only'):
+				instruction['reduceOnly'] = True
+			instructions.append(instruction)
+		return self.send_batch(instructions)
+
+	def cancel_orders(self, order_ids:list=None, client_order_ids:list=None) -> list:
+		"""
+		Cancels many orders in one batch request\n
+		Params:
+			order_ids			:	list	= exchange order ids
+			client_order_ids	:	list	= client order ids
+		Returns:
+			One batchStatus element per order, order_ids first then client_order_ids
+		"""
+		instructions = [{"order":"cancel", "order_id":order_id} for order_id in order_ids or []]
+		instructions += [{"order":"cancel", "cliOrdId":client_order_id} for client_order_id in client_order_ids or []]
+		return self.send_batch(instructions)
+
+	def edit_orders(self, edits:list) -> list:
+		"""
+		Amends many open orders in one batch request\n
+		Params:
+			edits	:	list	= dicts with order_id or client_order_id and the new quantity, price or stop_price. ie. [{"order_id":"...","price":30100}]
+		Returns:
+			One batchStatus element per edit
+		"""
+		instructions = []
+		for edit in edits:
+			instruction = {"order":"edit"}
+			if edit.get('order_id') is not None:
+				instruction['order_id'] = edit['order_id']
+			else:
+				instruction['cliOrdId'] = edit['client_order_id']
+			if edit.get('quantity') is not None:
+				instruction['size'] = edit['quantity']
+			if edit.get('price') is not None:
+				instruction['limitPrice'] = edit['price']
+			if edit.get('stop_price') is not None:
+				instruction['stopPrice'] = edit['stop_price']
+			instructions.append(instruction)
+		return self.send_batch(instructions)
+
 if __name__ == "__main__":
 
 	creds = {
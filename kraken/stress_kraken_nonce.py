@@ -0,0 +1,128 @@
+# Author - Karan Parmar
+
+"""
+KRAKEN FUTURES CONCURRENT SIGNING STRESS TEST
+
+	Fires thousands of concurrent signed private requests from a thread pool at a local stand-in server which checks every
+	Authent signature against the received body, Nonce header and path, and records every nonce. The stand-in recomputes
+	Authent with its own copy of the documented algorithm, not with the adapter's signing code.
+	Passes when no nonce repeats and no signature or payload is wrong. Nonces are increasing when generated, requests sent
+	from many threads can still reach the server out of order.
+
+	Run from this directory:
+		python stress_kraken_nonce.py [requests] [threads]
+"""
+
+# Importing built-in libraries
+import sys, time, socket, base64, hmac, hashlib
+from threading import Thread, Lock
+from urllib.parse import parse_qs, urlparse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Importing local modules
+from api_kraken_futures_rest import KrakenFuturesAPIREST
+
+CREDS = {
+	"public_key":"public",
+	"private_key":base64.b64encode(b"stand-in private key").decode(),
+	"account_type":"live"
+}
+
+def documented_authent(secret:str, post_data:str, nonce:str, endpoint_path:str) -> str:
+	"""
+	Authent written from the Kraken Futures API documentation, independently of the adapter\n
+		1. concatenate postData + Nonce + endpointPath
+		2. hash the result with SHA-256
+		3. base64 decode the api secret
+		4. HMAC-SHA-512 of the hash keyed with the decoded secret
+		5. base64 encode the result
+	"""
+	concatenated = post_data + nonce + endpoint_path
+	hashed = hashlib.sha256(concatenated.encode('utf-8')).digest()
+	key = base64.b64decode(secret)
+	return base64.b64encode(hmac.new(key, hashed, hashlib.sha512).digest()).decode('utf-8')
+
+class StandIn(BaseHTTPRequestHandler):
+
+	protocol_version = "HTTP/1.1"
+	lock = Lock()
+	nonces = []
+	bad_signatures = 0
+	bad_payloads = 0
+
+	def setup(self):
+		super().setup()
+		self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+	def _respond(self):
+		url = urlparse(self.path)
+		post_data = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode() if self.command == "POST" else url.query
+		nonce = self.headers['Nonce']
+		path = url.path[len("/derivatives"):]
+
+		expected = documented_authent(CREDS['private_key'], post_data, nonce, path)
+		params = parse_qs(post_data)
+
+		with StandIn.lock:
+			StandIn.nonces.append(int(nonce))
+			StandIn.bad_signatures += expected != self.headers['Authent']
+			# Every call sends its own client id and nothing leaked from another call's payload
+			StandIn.bad_payloads += sorted(params) != ['cliOrdId', 'orderType', 'side', 'size', 'symbol']
+
+		body = b'{"result":"success"}'
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	do_GET = do_POST = _respond
+
+	def log_message(self, *args):
+		...
+
+class Server(ThreadingHTTPServer):
+
+	daemon_threads = True
+	request_queue_size = 1024
+
+if __name__ == "__main__":
+
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+	threads = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+	server = Server(("127.0.0.1", 0), StandIn)
+	Thread(target=server.serve_forever, daemon=True).start()
+
+	api = KrakenFuturesAPIREST(CREDS)
+
+	# The verifier has to tell the documented scheme apart from the spot scheme, sha256(postData + nonce) + path
+	post_data, nonce, path = "orderType=mkt&symbol=PF_XBTUSD&side=buy&size=1", "1700000000000000", "/api/v3/sendorder"
+	spot = hashlib.sha256((post_data + nonce).encode()).digest() + path.encode()
+	spot = base64.b64encode(hmac.new(base64.b64decode(CREDS['private_key']), spot, hashlib.sha512).digest()).decode()
+	assert documented_authent(CREDS['private_key'], post_data, nonce, path) != spot
+
+	api.url = f"http://127.0.0.1:{server.server_port}/derivatives"
+	order = {"orderType":"mkt", "symbol":"PF_XBTUSD", "side":"buy", "size":1}
+
+	def send(i:int):
+		return api._private_request("POST", "/api/v3/sendorder", {**order, "cliOrdId":f"stress-{i}"}).status_code
+
+	start = time.perf_counter()
+	with ThreadPoolExecutor(max_workers=threads) as executor:
+		statuses = list(executor.map(send, range(n)))
+	elapsed = time.perf_counter() - start
+
+	nonces = StandIn.nonces
+	print(f"requests {n}   threads {threads}   {elapsed:.2f}s   {n / elapsed:.0f} requests/s")
+	print(f"non 200 {sum(s != 200 for s in statuses)}   duplicate nonces {len(nonces) - len(set(nonces))}   bad signatures {StandIn.bad_signatures}   bad payloads {StandIn.bad_payloads}")
+
+	# The previous millisecond clock nonce on the same thread count, for comparison
+	with ThreadPoolExecutor(max_workers=threads) as executor:
+		clock = list(executor.map(lambda _: int(1000 * time.time()), range(n)))
+	print(f"millisecond clock nonces, duplicates {len(clock) - len(set(clock))} of {n}")
+
+	ok = len(nonces) == n and len(set(nonces)) == n and not StandIn.bad_signatures and not StandIn.bad_payloads
+	print("PASS" if ok else "FAIL")
+	sys.exit(0 if ok else 1)
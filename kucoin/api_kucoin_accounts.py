@@ -0,0 +1,91 @@
+# Author - Karan Parmar
+
+"""
+KUCOIN ACCOUNTS CACHE
+
+	Snapshot of the /api/v1/accounts list indexed by account id and by (currency, type), so balance checks are dictionary
+	lookups. While the /account/balance push channel is live the snapshot is updated from it, otherwise it is refetched
+	once it is older than max_staleness seconds.
+"""
+
+# Importing built-in libraries
+import time
+from threading import Lock
+
+class KucoinAccountCache:
+
+	def __init__(self, fetch, max_staleness:float=5):
+		"""
+		Params:
+			fetch			:	callable	= accounts request. ie. lambda: api._request('GET', '/api/v1/accounts')
+			max_staleness	:	float		= seconds a snapshot is used without the push channel
+		"""
+		self.MAX_STALENESS = max_staleness
+
+		self._fetch = fetch
+		self._lock = Lock()
+
+		self.accounts = []
+		self.by_id = {}
+		self.by_key = {}
+		self.updated_at = 0
+		self.is_live = False
+
+	# Public methods
+	def refresh(self) -> None:
+		"""
+		Replaces the snapshot with the REST accounts list\n
+		"""
+		with self._lock:
+			accounts = self._fetch()
+			self.accounts = accounts
+			self.by_id = {account['id']: account for account in accounts}
+			self.by_key = {}
+			for account in accounts:
+				self.by_key.setdefault((account['currency'], account['type']), account)
+			self.updated_at = time.time()
+
+	def invalidate(self) -> None:
+		"""
+		Forces a refetch on the next read\n
+		"""
+		self.updated_at = 0
+
+	def get_accounts(self) -> list:
+		"""
+		Returns the snapshot, refetched when stale\n
+		"""
+		if not self.updated_at or (not self.is_live and time.time() - self.updated_at > self.MAX_STALENESS):
+			self.refresh()
+		return self.accounts
+
+	def get_by_id(self, account_id:str) -> dict:
+		self.get_accounts()
+		return self.by_id.get(account_id)
+
+	def get(self, currency:str, account_type:str=None) -> dict:
+		"""
+		Returns the account of a currency, the first listed one when account_type is None\n
+		Params:
+			currency		:	str		= currency. ie. USDT
+			account_type	:	str		= main, trade, margin ...
+		"""
+		accounts = self.get_accounts()
+		if account_type is not None:
+			return self.by_key.get((currency, account_type))
+		for account in accounts:
+			if account['currency'] == currency:
+				return account
+
+	def on_balance(self, data:dict) -> None:
+		"""
+		Applies an account.balance push event\n
+		"""
+		account = self.by_id.get(data['accountId'])
+		if account is None:
+			# New account, only a refetch knows its type
+			self.invalidate()
+			return
+		account['balance'] = data['total']
+		account['available'] = data['available']
+		account['holds'] = data['hold']
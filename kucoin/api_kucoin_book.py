@@ -0,0 +1,293 @@
+# Author - Karan Parmar
+
+"""
+KUCOIN LEVEL 2 ORDER BOOK
+
+	Full depth local order book of Kucoin SPOT and FUTURES built from a REST snapshot and the level2 push channel.
+	Deltas are aligned with the snapshot sequence through sequenceStart/sequenceEnd, any gap drops the book and the next
+	delta takes a new snapshot. Snapshots download on worker threads while the deltas of that symbol are buffered, the socket
+	thread never waits on REST.
+
+	Each side is a pair of sorted arrays ordered so the best level is last, price lookups are a binary search, best bid/ask is
+	the last element. Inserts and deletes shift the list, O(n), which stays cheap as changes cluster at the best level.
+"""
+
+# Importing built-in libraries
+from bisect import bisect_left
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+# Importing local modules
+from api_kucoin_ws import KucoinWSAPP
+
+class KucoinBookSide:
+
+	def __init__(self, is_bid:bool):
+		"""
+		Params:
+			is_bid	:	bool	= bids side, asks are keyed by negative price so both sides keep the best level last
+		"""
+		self.IS_BID = is_bid
+
+		self._keys = []
+		self._sizes = []
+
+	def __len__(self) -> int:
+		return len(self._keys)
+
+	# Public methods
+	def clear(self) -> None:
+		self._keys.clear()
+		self._sizes.clear()
+
+	def update(self, price:float, size:float) -> None:
+		"""
+		Sets the size of a price level, 0 removes the level\n
+		"""
+		key = price if self.IS_BID else -price
+		keys = self._keys
+		i = bisect_left(keys, key)
+		if i < len(keys) and keys[i] == key:
+			if size:
+				self._sizes[i] = size
+			else:
+				del keys[i]
+				del self._sizes[i]
+		elif size:
+			keys.insert(i, key)
+			self._sizes.insert(i, size)
+
+	def load(self, levels:list) -> None:
+		"""
+		Replaces the side with snapshot levels [[price, size], ...]\n
+		"""
+		book = sorted((float(p) if self.IS_BID else -float(p), float(s)) for p, s in levels if float(s))
+		self._keys = [k for k, _ in book]
+		self._sizes = [s for _, s in book]
+
+	def best(self) -> tuple:
+		"""
+		Returns (price, size) of the best level or (None, None) when empty\n
+		"""
+		if not self._keys:
+			return None, None
+		key = self._keys[-1]
+		return (key if self.IS_BID else -key), self._sizes[-1]
+
+	def get_size(self, price:float) -> float:
+		"""
+		Returns the size resting at a price\n
+		"""
+		key = price if self.IS_BID else -price
+		i = bisect_left(self._keys, key)
+		if i < len(self._keys) and self._keys[i] == key:
+			return self._sizes[i]
+		return 0.0
+
+	def get_vwap(self, size:float) -> float:
+		"""
+		Returns the average price of taking size from the best level down, None when the side is not deep enough\n
+		"""
+		remaining, notional = size, 0.0
+		for i in range(len(self._keys) - 1, -1, -1):
+			take = min(remaining, self._sizes[i])
+			notional += take * abs(self._keys[i])
+			remaining -= take
+			if remaining <= 0:
+				return notional / size
+		return None
+
+	def get_levels(self, n:int=None) -> list:
+		"""
+		Returns the top n levels as [[price, size], ...] best first\n
+		"""
+		n = len(self._keys) if n is None else min(n, len(self._keys))
+		return [[abs(self._keys[i]), self._sizes[i]] for i in range(len(self._keys) - 1, len(self._keys) - 1 - n, -1)]
+
+class KucoinOrderBook:
+
+	def __init__(self, symbol:str):
+		"""
+		Params:
+			symbol	:	str		= symbol of the book. ie. BTC-USDT or XBTUSDTM
+		"""
+		self.symbol = symbol
+		self.bids = KucoinBookSide(is_bid=True)
+		self.asks = KucoinBookSide(is_bid=False)
+
+		self.sequence = None
+		self.resyncs = 0
+
+	@property
+	def is_synced(self) -> bool:
+		return self.sequence is not None
+
+	# Public methods
+	def reset(self) -> None:
+		"""
+		Drops the book, the next delta takes a new snapshot\n
+		"""
+		self.sequence = None
+		self.bids.clear()
+		self.asks.clear()
+
+	def load_snapshot(self, snapshot:dict) -> None:
+		"""
+		Loads a REST level 2 snapshot {sequence, bids, asks}\n
+		"""
+		self.bids.load(snapshot['bids'])
+		self.asks.load(snapshot['asks'])
+		self.sequence = int(snapshot['sequence'])
+
+	def apply(self, delta:dict) -> bool:
+		"""
+		Applies a level2 delta {sequenceStart, sequenceEnd, changes:{asks, bids}} with changes as [price, size, sequence]\n
+		Returns:
+			False when the delta does not continue the book, the book is reset and needs a new snapshot
+		"""
+		if delta['sequenceEnd'] <= self.sequence:
+			return True
+		if delta['sequenceStart'] > self.sequence + 1:
+			self.reset()
+			self.resyncs += 1
+			return False
+
+		for side, changes in ((self.bids, delta['changes']['bids']), (self.asks, delta['changes']['asks'])):
+			for price, size, sequence in changes:
+				# Price 0 only moves the sequence
+				if int(sequence) > self.sequence and float(price):
+					side.update(float(price), float(size))
+		self.sequence = delta['sequenceEnd']
+		return True
+
+	def get_best_bid(self) -> tuple:
+		return self.bids.best()
+
+	def get_best_ask(self) -> tuple:
+		return self.asks.best()
+
+	def get_depth_at(self, price:float) -> tuple:
+		"""
+		Returns (bid size, ask size) resting at a price\n
+		"""
+		return self.bids.get_size(price), self.asks.get_size(price)
+
+	def get_vwap(self, side:str, size:float) -> float:
+		"""
+		Returns the average fill price of a market order of size, None when the book is not deep enough\n
+		Params:
+			side	:	str		= buy takes the asks, sell takes the bids
+			size	:	float	= order size
+		"""
+		return (self.asks if side.lower() == 'buy' else self.bids).get_vwap(size)
+
+	def get_order_book(self, levels:int=None) -> dict:
+		"""
+		Returns the top levels of both sides as [[price, size], ...] best first\n
+		"""
+		return {
+			'sequence':self.sequence,
+			'bids':self.bids.get_levels(levels),
+			'asks':self.asks.get_levels(levels),
+		}
+
+class KucoinBookStream(KucoinWSAPP):
+
+	TOPICS = {
+		"SPOT":"/market/level2",
+		"FUTURES":"/contractMarket/level2",
+	}
+
+	# Symbols per subscribe topic
+	SYMBOLS_PER_TOPIC = 100
+
+	def __init__(self, get_token, get_snapshot, symbols:list, market:str="SPOT", snapshot_workers:int=4):
+		"""
+		Params:
+			get_token			:	callable	= public bullet token request. ie. lambda: api._request('POST', '/api/v1/bullet-public', auth=False)
+			get_snapshot		:	callable	= REST level 2 snapshot of a symbol
+			symbols				:	list		= symbols to replicate. ie. ['BTC-USDT']
+			market				:	str			= SPOT or FUTURES
+			snapshot_workers	:	int			= snapshots downloaded at once
+		"""
+		self.MARKET = market.upper()
+		topic = self.TOPICS[self.MARKET]
+		size = self.SYMBOLS_PER_TOPIC
+		super().__init__(get_token, [f"{topic}:{','.join(symbols[i:i + size])}" for i in range(0, len(symbols), size)])
+
+		self._get_snapshot = get_snapshot
+		self.books = {s: KucoinOrderBook(s) for s in symbols}
+
+		# Deltas buffered per symbol while its snapshot downloads, None when no download is in flight
+		self._buffers = {s: None for s in symbols}
+		self._locks = {s: Lock() for s in symbols}
+		self._executor = ThreadPoolExecutor(max_workers=snapshot_workers)
+
+	# Private methods
+	def _on_welcome(self, ws) -> None:
+		"""
+		Deltas missed while disconnected cannot be replayed, every book is resynced\n
+		"""
+		for symbol, book in self.books.items():
+			with self._locks[symbol]:
+				book.reset()
+				self._buffers[symbol] = None
+		super()._on_welcome(ws)
+
+	def _apply(self, book:KucoinOrderBook, data:dict) -> bool:
+		if book.apply(data):
+			return True
+		print("KUCOIN_BOOK_RESYNC", book.symbol, data['sequenceStart'], data['sequenceEnd'])
+		return False
+
+	def _load_snapshot(self, book:KucoinOrderBook) -> None:
+		"""
+		Downloads the snapshot on a worker thread, then loads it and replays the deltas buffered meanwhile\n
+		"""
+		try:
+			snapshot = self._get_snapshot(book.symbol)
+		except Exception as e:
+			print("KUCOIN_BOOK_SNAPSHOT_ERROR", book.symbol, e)
+			snapshot = None
+
+		with self._locks[book.symbol]:
+			buffer, self._buffers[book.symbol] = self._buffers[book.symbol], None
+			# No buffer means the socket reconnected during the download, the next delta starts a new one
+			if snapshot is None or buffer is None:
+				return
+			book.load_snapshot(snapshot)
+			for delta in buffer:
+				if not self._apply(book, delta):
+					return
+
+	def _on_topic(self, topic:str, subject:str, data:dict) -> None:
+		symbol = topic.split(':', 1)[1]
+		book = self.books.get(symbol)
+		if book is None:
+			return
+
+		if self.MARKET == "FUTURES":
+			# One change "price,side,size" per message
+			price, side, size = data['change'].split(',')
+			sequence = data['sequence']
+			data = {
+				'sequenceStart':sequence,
+				'sequenceEnd':sequence,
+				'changes':{
+					'bids':[[price, size, sequence]] if side == 'buy' else [],
+					'asks':[[price, size, sequence]] if side == 'sell' else [],
+				},
+			}
+
+		with self._locks[symbol]:
+			if book.is_synced:
+				self._apply(book, data)
+			elif self._buffers[symbol] is None:
+				self._buffers[symbol] = [data]
+				self._executor.submit(self._load_snapshot, book)
+			else:
+				self._buffers[symbol].append(data)
+
+	# Public methods
+	def get_book(self, symbol:str) -> KucoinOrderBook:
+		return self.books[symbol]
@@ -5,15 +5,17 @@ Kucoin FUTURES REST API
 """
 
 # Importing built-in libraries
-import json, time, pytz
-from datetime import datetime
-import hmac, base64, hashlib
 from uuid import uuid1
-from urllib.parse import urljoin
 
 # Importing third-party libraries
 import pandas as pd					# pip install pandas
-import requests						# pip install requests
+
+# Importing local modules
+from api_kucoin_book import KucoinBookStream, KucoinOrderBook
+from api_kucoin_klines import KucoinKlineBackfill
+from api_kucoin_session import KucoinSession
+from api_kucoin_submit import KucoinOrderSubmitter, check_lookup_response
+from api_kucoin_ws import KucoinOrderStream
 
 class KucoinFuturesAPIREST:
 
@@ -30,66 +32,57 @@ class KucoinFuturesAPIREST:
 
 	is_v1_api = False
 
-	def __init__(self, creds:dict):
+	# Local order store, set by start_user_stream
+	_user_stream = None
+
+	def __init__(self, creds:dict, submit_mode:str="DIRECT", submit_retries:int=2):
 		
 		self.CREDS = creds
+		# DIRECT sends once, RETRY resolves timeouts by clientOid before resending
+		# NOTE HEDGED is spot only, it needs endpoints rejecting duplicate clientOids
+		self.SUBMIT_MODE = submit_mode.upper()
+		if self.SUBMIT_MODE not in ["DIRECT", "RETRY"]:
+			raise Exception(f"unsupported submit mode {submit_mode} for futures, use DIRECT or RETRY")
 
 		if self.CREDS['account_type'].lower() in ['sandbox','testnet','test','demo']:
 			self.url = self.SANDBOX_ENDPOINT
 		else:
 			self.url = self.LIVE_ENDPOINT
 
+		# Fill callbacks, kept here so they can be registered before start_user_stream
+		self._fill_listeners = []
+
+		# Pooled keep-alive transport with the auth material precomputed
+		self.session = KucoinSession(self.url, creds, is_v1_api=self.is_v1_api)
+
+		# Timeout safe placement, see KucoinOrderSubmitter
+		self._submitter = KucoinOrderSubmitter(
+			lambda endpoint, params: self._request('POST', endpoint, params=params),
+			lambda params: self.get_order_by_client_oid(params['clientOid']),
+			KucoinSession.NETWORK_ERRORS,
+			retries=submit_retries,
+		)
+
+		# Paginated concurrent candle downloads, from/to in milliseconds and at most 200 candles per request
+		self._kline_backfill = KucoinKlineBackfill(self._fetch_candles, limit=200, columns=['datetime','open','high','low','close','volume','turnover'], time_unit='ms')
+
 	# Private methods
 	def _request(self, method, uri, timeout=5, auth=True, params=None):
-		uri_path = uri
-		data_json = ''
-		if method in ['GET', 'DELETE']:
-			if params:
-				strl = []
-				for key in sorted(params):
-					strl.append("{}={}".format(key, params[key]))
-				data_json += '&'.join(strl)
-				uri += '?' + data_json
-				uri_path = uri
-		else:
-			if params:
-				data_json = json.dumps(params)
-
-				uri_path = uri + data_json
-
-		headers = {}
-		if auth:
-			now_time = int(time.time()) * 1000
-			str_to_sign = str(now_time) + method + uri_path
-			sign = base64.b64encode(hmac.new(self.CREDS['api_secret'].encode('utf-8'), str_to_sign.encode('utf-8'), hashlib.sha256).digest())
-			if self.is_v1_api:
-				headers = {
-					"KC-API-SIGN": sign,
-					"KC-API-TIMESTAMP": str(now_time),
-					"KC-API-KEY": self.CREDS['api_key'],
-					"KC-API-PASSPHRASE": self.CREDS['passphrase'],
-					"Content-Type": "application/json"
-				}
-			else:
-				passphrase = base64.b64encode(
-					hmac.new(self.CREDS['api_secret'].encode('utf-8'), self.CREDS['passphrase'].encode('utf-8'), hashlib.sha256).digest())
-				headers = {
-					"KC-API-SIGN": sign,
-					"KC-API-TIMESTAMP": str(now_time),
-					"KC-API-KEY": self.CREDS['api_key'],
-					"KC-API-PASSPHRASE": passphrase,
-					"Content-Type": "application/json",
-					"KC-API-KEY-VERSION": "2"
-				}
-		headers["User-Agent"] = "kucoin-python-sdk/" + '1.0.0' #version
-		url = urljoin(self.url, uri)
-
-		if method in ['GET', 'DELETE']:
-			response_data = requests.request(method, url, headers=headers, timeout=timeout)
-		else:
-			response_data = requests.request(method, url, headers=headers, data=data_json, timeout=timeout)
+		response_data = self.session.request(method, uri, timeout=timeout, auth=auth, params=params)
 		return self.check_response_data(response_data)
-	
+
+	def _fetch_candles(self, symbol:str, timeframe:str, start_ms:int, end_ms:int) -> list:
+		"""
+		Downloads the candles of one [start_ms, end_ms) window\n
+		"""
+		params = {
+			'symbol':symbol,
+			'granularity':KucoinKlineBackfill.get_minutes(timeframe),
+			'from':start_ms,
+			'to':end_ms - 1
+		}
+		return self._request('GET','/api/v1/kline/query',params=params)
+
 	@staticmethod
 	def check_response_data(response_data):
 		if response_data.status_code == 200:
@@ -156,30 +149,39 @@ class KucoinFuturesAPIREST:
 		data = self._request(method, endpoint, params=params)
 		return float(data['availableBalance'])
 
-	def get_candle_data(self, symbol:str, timeframe:str, period:str='1d') -> pd.DataFrame:
+	def get_candle_data(self, symbol:str, timeframe:str, period:str='1d', max_workers:int=4) -> pd.DataFrame:
 		"""
-		Get realtime candlestick data\n
+		Get historical candlestick data\n
 		symbol		: 	str 	= symbol of the ticker\n
-		timeframe	: 	str 	= timeframe of the candles\n
-		period		:	str		= period of the data\n
+		timeframe	: 	str 	= timeframe of the candles. ie. 1m, 15m, 1h, 1d\n
+		period		:	str		= period of the data up to now. ie. 1d, 2w\n
+		max_workers	:	int		= windows downloaded at once\n
 		"""
-		params = {
-			'symbol':symbol,
-			'granularity':int(timeframe[:-1])
-		}
-		data = self._request('GET','/api/v1/kline/query',params=params)
-		df = pd.DataFrame(data)
-		df = df.rename({0:"datetime",1:"open",2:"close",3:"high",4:"low",5:"volume"}, axis='columns')
-		df.set_index('datetime', inplace=True)
-		df = df[['open','high','low','close','volume']]
-		df.index = df.index.astype(int)
-		df['open'] = df['open'].astype(float)
-		df['high'] = df['high'].astype(float)
-		df['low'] = df['low'].astype(float)
-		df['close'] = df['close'].astype(float)
-		df['volume'] = df['volume'].astype(float)
-		df.index = [datetime.fromtimestamp(x/1000,pytz.timezone(self.TIMEZONE)) for x in df.index]
-		return df
+		start_ms = int((pd.Timestamp.now(tz='UTC') - pd.Timedelta(period)).timestamp() * 1000)
+		return self._kline_backfill.get_candle_data(symbol, timeframe, start_ms, max_workers=max_workers)
+
+	def stream_full_order_books(self, symbols:list) -> KucoinBookStream:
+		"""
+		Keeps a full depth local order book of each symbol from a level 2 snapshot and the level2 deltas\n
+		Params:
+			symbols	:	list	=	symbols to replicate
+		Returns:
+			The running stream, read it with get_full_order_book
+		"""
+		self._book_stream = KucoinBookStream(
+			lambda: self._request('POST', '/api/v1/bullet-public', auth=False),
+			lambda symbol: self._request('GET', '/api/v1/level2/snapshot', params={'symbol':symbol}, auth=False),
+			symbols,
+			market=self.MARKET,
+		)
+		self._book_stream.start()
+		return self._book_stream
+
+	def get_full_order_book(self, symbol:str) -> KucoinOrderBook:
+		"""
+		Returns the local book of the symbol with best bid/ask, depth at price and VWAP queries, check is_synced before trading on it\n
+		"""
+		return self._book_stream.get_book(symbol)
 
 	def place_order(self, symbol:str, side:str, quantity:str, order_type:str="MARKET", price:float=None, leverage:float=1, to_open:bool=True) -> str:
 		"""
@@ -195,6 +197,8 @@ class KucoinFuturesAPIREST:
 		
 		Returns:
 			order id will be returned if order executed successfully
+		NOTE In RETRY submit mode a timeout is resolved by clientOid, a resend happens only after the lookup still finds no
+		order SETTLE seconds after the failed send\n
 		"""
 		clOrderId = self._return_unique_id
 		params = {
@@ -214,7 +218,10 @@ class KucoinFuturesAPIREST:
 			params['reduceOnly'] = True
 			del params['size']
 
-		response = self._request('POST','/api/v1/orders',params=params)
+		if self.SUBMIT_MODE == "DIRECT":
+			response = self._request('POST','/api/v1/orders',params=params)
+		else:
+			response = self._submitter.submit('/api/v1/orders', params)
 		return response['orderId']
 
 	def query_order(self, order_id:str) -> dict:
@@ -222,10 +229,52 @@ class KucoinFuturesAPIREST:
 		Queries order\n
 		Params:
 			order_id	:	str		= order id to get the information of
+		NOTE Answered from the order stream store while it is live, REST on cache miss or while it reconnects\n
+		"""
+		order = self._user_stream and self._user_stream.get_order(order_id)
+		if not order:
+			method = "GET"
+			endpoint = f"/api/v1/orders/{order_id}"
+			order = self._request(method, endpoint)
+			self._user_stream and self._user_stream.put_order(order)
+		return order
+
+	def get_order_by_client_oid(self, client_oid:str) -> dict:
+		"""
+		Queries order by the client order id\n
+		Params:
+			client_oid	:	str		= clientOid sent with the order
+		NOTE Raises KucoinOrderNotFound when the exchange answers the order does not exist\n
 		"""
 		method = "GET"
-		endpoint = f"/api/v1/orders/{order_id}"
-		return self._request(method, endpoint)
+		endpoint = "/api/v1/orders/byClientOid"
+		params = {
+			'clientOid':client_oid
+		}
+		response_data = self.session.request(method, endpoint, params=params)
+		return check_lookup_response(response_data, self.check_response_data)
+
+	def start_user_stream(self) -> KucoinOrderStream:
+		"""
+		Streams order changes of the account into a local store\n
+		Returns:
+			The running stream, query_order reads from it and add_fill_listener registers fill callbacks
+		"""
+		self._user_stream = KucoinOrderStream(lambda: self._request('POST', '/api/v1/bullet-private'), market=self.MARKET)
+		for callback in self._fill_listeners:
+			self._user_stream.add_fill_listener(callback)
+		self._user_stream.start()
+		return self._user_stream
+
+	def add_fill_listener(self, callback) -> None:
+		"""
+		Registers a callable receiving every fill pushed on the order stream\n
+		Params:
+			callback	:	callable	= receives {symbol, orderId, clientOid, tradeId, side, price, size, liquidity, time}
+		NOTE Callbacks registered before start_user_stream are attached when the stream starts\n
+		"""
+		self._fill_listeners.append(callback)
+		self._user_stream and self._user_stream.add_fill_listener(callback)
 
 	def cancel_order(self, order_id:str) -> None:
 		"""
@@ -237,6 +286,22 @@ class KucoinFuturesAPIREST:
 		endpoint = f"/api/v1/orders/{order_id}"
 		self._request(method, endpoint)
 
+	def cancel_all(self, symbol:str) -> list:
+		"""
+		Cancels all open orders of a symbol in one request\n
+		Params:
+			symbol	:	str		= symbol of the ticker
+		Returns:
+			Ids of the cancelled orders
+		"""
+		method = "DELETE"
+		endpoint = "/api/v1/orders"
+		params = {
+			'symbol':symbol
+		}
+		response = self._request(method, endpoint, params=params)
+		return response.get('cancelledOrderIds', [])
+
 if __name__ == "__main__":
 
 	creds = {
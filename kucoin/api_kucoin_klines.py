@@ -0,0 +1,94 @@
+# Author - Karan Parmar
+
+"""
+KUCOIN KLINE BACKFILL
+
+	Splits a [start, end) range into windows of at most limit candles and downloads them concurrently on a bounded
+	thread pool, then merges and dedupes the pages into one sorted frame.
+	Kucoin returns the newest candles of a window when it holds more than the cap, so windows never exceed limit candles.
+"""
+
+# Importing built-in libraries
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Importing third-party libraries
+import pandas as pd					# pip install pandas
+
+class KucoinKlineBackfill:
+
+	TIMEFRAME_MINUTES = {
+		'm':1,
+		'h':60,
+		'd':1440,
+		'w':10080,
+	}
+
+	def __init__(self, fetch, limit:int, columns:list, time_unit:str='ms', max_workers:int=4):
+		"""
+		Params:
+			fetch		:	callable	= downloads one window, fetch(symbol, timeframe, start_ms, end_ms) -> rows
+			limit		:	int			= candles per request. ie. 1500 for spot, 200 for futures
+			columns		:	list		= column names of a row, the first is the open time
+			time_unit	:	str			= unit of the open time, s or ms
+			max_workers	:	int			= concurrent requests in flight
+		"""
+		self.LIMIT = limit
+		self.COLUMNS = columns
+		self.TIME_UNIT = time_unit
+		self.MAX_WORKERS = max_workers
+
+		self._fetch = fetch
+
+	# Helper methods
+	@classmethod
+	def get_minutes(cls, timeframe:str) -> int:
+		"""
+		Returns the minutes of a timeframe. ie. 15m -> 15, 4h -> 240\n
+		"""
+		return int(timeframe[:-1]) * cls.TIMEFRAME_MINUTES[timeframe[-1]]
+
+	# Private methods
+	def _fetch_window(self, symbol:str, timeframe:str, start_ms:int, end_ms:int) -> list:
+		page = self._fetch(symbol, timeframe, start_ms, end_ms)
+		# check_response_data returns the whole response when data is empty
+		return page if isinstance(page, list) else []
+
+	# Public methods
+	def fetch(self, symbol:str, timeframe:str, start_ms:int, end_ms:int=None, max_workers:int=None) -> list:
+		"""
+		Downloads all candles in [start_ms, end_ms)\n
+		Returns:
+			Raw rows sorted by open time with duplicates from overlapping pages removed
+		"""
+		end_ms = end_ms or int(time.time() * 1000)
+		window_ms = self.LIMIT * self.get_minutes(timeframe) * 60000
+		windows = [(i, min(i + window_ms, end_ms)) for i in range(start_ms, end_ms, window_ms)]
+
+		if len(windows) <= 1:
+			pages = [self._fetch_window(symbol, timeframe, start, end) for start, end in windows]
+		else:
+			with ThreadPoolExecutor(max_workers=min(max_workers or self.MAX_WORKERS, len(windows))) as executor:
+				pages = list(executor.map(lambda w: self._fetch_window(symbol, timeframe, *w), windows))
+
+		rows = {}
+		for page in pages:
+			for row in page:
+				rows[int(row[0])] = row
+		return [rows[i] for i in sorted(rows)]
+
+	def to_dataframe(self, rows:list) -> pd.DataFrame:
+		"""
+		Converts raw rows to an OHLCV frame indexed by UTC open time\n
+		"""
+		df = pd.DataFrame(rows, columns=self.COLUMNS[:len(rows[0])] if rows else self.COLUMNS)
+		df.index = pd.to_datetime(df['datetime'].astype('int64'), unit=self.TIME_UNIT, utc=True)
+		df = df[['open','high','low','close','volume']].astype(float)
+		df.index.name = None
+		return df
+
+	def get_candle_data(self, symbol:str, timeframe:str, start_ms:int, end_ms:int=None, max_workers:int=None) -> pd.DataFrame:
+		"""
+		Downloads all candles in [start_ms, end_ms) as an OHLCV frame\n
+		"""
+		return self.to_dataframe(self.fetch(symbol, timeframe, start_ms, end_ms, max_workers=max_workers))
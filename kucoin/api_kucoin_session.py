@@ -0,0 +1,102 @@
+# Author - Karan Parmar
+
+"""
+KUCOIN REST SESSION
+
+	Signed REST transport shared by the Kucoin SPOT and FUTURES adapters.
+	Keeps a pooled keep-alive requests.Session per adapter so calls reuse their TCP/TLS connections, and computes the auth
+	material that never changes once: the v2 passphrase signature, the keyed HMAC and the header templates.
+"""
+
+# Importing built-in libraries
+import json, time
+import hmac, base64, hashlib
+from urllib.parse import urljoin
+
+# Importing third-party libraries
+import requests						# pip install requests
+from requests.adapters import HTTPAdapter
+
+class KucoinSession:
+
+	USER_AGENT = "kucoin-python-sdk/1.0.0"
+
+	# Failures after which the request may or may not have reached the exchange
+	NETWORK_ERRORS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+
+	def __init__(self, url:str, creds:dict, is_v1_api:bool=False, pool_size:int=10):
+		"""
+		Params:
+			url			:	str		= api endpoint. ie. https://api.kucoin.com
+			creds		:	dict	= api_key, api_secret and passphrase
+			is_v1_api	:	bool	= v1 keys send the passphrase in plain text
+			pool_size	:	int		= keep-alive connections kept for concurrent calls
+		"""
+		self.url = url
+
+		self.session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+		self.session.mount("https://", adapter)
+		self.session.mount("http://", adapter)
+
+		# Keyed HMAC computed once, copied for every signature
+		self._hmac = hmac.new(creds['api_secret'].encode('utf-8'), digestmod=hashlib.sha256)
+
+		self._public_headers = {"User-Agent":self.USER_AGENT}
+		if is_v1_api:
+			self._auth_headers = {
+				"KC-API-KEY":creds['api_key'],
+				"KC-API-PASSPHRASE":creds['passphrase'],
+				"Content-Type":"application/json",
+				"User-Agent":self.USER_AGENT,
+			}
+		else:
+			passphrase = self._hmac.copy()
+			passphrase.update(creds['passphrase'].encode('utf-8'))
+			self._auth_headers = {
+				"KC-API-KEY":creds['api_key'],
+				"KC-API-PASSPHRASE":base64.b64encode(passphrase.digest()).decode(),
+				"Content-Type":"application/json",
+				"KC-API-KEY-VERSION":"2",
+				"User-Agent":self.USER_AGENT,
+			}
+
+	# Private methods
+	def _sign(self, message:str) -> str:
+		signature = self._hmac.copy()
+		signature.update(message.encode('utf-8'))
+		return base64.b64encode(signature.digest()).decode()
+
+	# Public methods
+	def request(self, method:str, uri:str, timeout:float=5, auth:bool=True, params:dict=None) -> requests.Response:
+		"""
+		Sends a request signed the way Kucoin expects\n
+		Params:
+			method	:	str		= GET, POST or DELETE
+			uri		:	str		= endpoint path. ie. /api/v1/orders
+			timeout	:	float	= seconds to wait for the response
+			auth	:	bool	= sign the request
+			params	:	dict	= query params of GET and DELETE, json body otherwise
+		"""
+		data_json = ''
+		if method in ['GET', 'DELETE']:
+			if params:
+				uri += '?' + '&'.join("{}={}".format(key, params[key]) for key in sorted(params))
+			uri_path = uri
+		else:
+			if params:
+				data_json = json.dumps(params)
+			uri_path = uri + data_json
+
+		if auth:
+			now_time = str(int(time.time() * 1000))
+			headers = dict(self._auth_headers)
+			headers["KC-API-SIGN"] = self._sign(now_time + method + uri_path)
+			headers["KC-API-TIMESTAMP"] = now_time
+		else:
+			headers = self._public_headers
+
+		url = urljoin(self.url, uri)
+		if method in ['GET', 'DELETE']:
+			return self.session.request(method, url, headers=headers, timeout=timeout)
+		return self.session.request(method, url, headers=headers, data=data_json, timeout=timeout)
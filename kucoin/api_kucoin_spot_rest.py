@@ -5,15 +5,21 @@ Kucoin FUTURES REST API
 """
 
 # Importing built-in libraries
-import json, time, pytz
-from datetime import datetime
-import hmac, base64, hashlib
 from uuid import uuid1
-from urllib.parse import urljoin
+from threading import Lock
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # Importing third-party libraries
 import pandas as pd					# pip install pandas
-import requests						# pip install requests
+
+# Importing local modules
+from api_kucoin_accounts import KucoinAccountCache
+from api_kucoin_book import KucoinBookStream, KucoinOrderBook
+from api_kucoin_klines import KucoinKlineBackfill
+from api_kucoin_session import KucoinSession
+from api_kucoin_submit import KucoinOrderSubmitter, check_lookup_response
+from api_kucoin_ws import KucoinOrderStream, KucoinBalanceStream
 
 class KucoinSPOTAPIREST:
 
@@ -30,67 +36,131 @@ class KucoinSPOTAPIREST:
 
 	is_v1_api = False
 
-	def __init__(self, creds:dict):
+	# Orders per multi order request, all of one symbol
+	MULTI_ORDERS_LIMIT = 5
+
+	# Order endpoints per order mode, HF endpoints need the symbol to cancel and query
+	ORDER_ENDPOINTS = {
+		"CLASSIC":"/api/v1/orders",
+		"HF":"/api/v1/hf/orders",
+		"HF_SYNC":"/api/v1/hf/orders/sync",
+	}
+	MULTI_ORDER_ENDPOINTS = {
+		"CLASSIC":"/api/v1/orders/multi",
+		"HF":"/api/v1/hf/orders/multi",
+		"HF_SYNC":"/api/v1/hf/orders/multi/sync",
+	}
+
+	# Local order store, set by start_user_stream
+	_user_stream = None
+
+	# Done orders kept from the HF sync endpoints, the oldest are evicted past the limit
+	SYNC_ORDERS_LIMIT = 1000
+
+	def __init__(self, creds:dict, order_mode:str="CLASSIC", account_max_staleness:float=5, submit_mode:str="DIRECT", submit_retries:int=2):
 		
 		self.CREDS = creds
+		# CLASSIC, HF for the high frequency endpoints or HF_SYNC for the HF endpoints returning the fill state
+		self.ORDER_MODE = order_mode.upper()
+		# DIRECT sends once, RETRY resolves timeouts by clientOid before resending, HEDGED also sends twice over two pools
+		self.SUBMIT_MODE = submit_mode.upper()
+		if self.SUBMIT_MODE not in ["DIRECT", "RETRY", "HEDGED"]:
+			raise Exception(f"unknown submit mode {submit_mode}, use DIRECT, RETRY or HEDGED")
+		if self.SUBMIT_MODE != "DIRECT" and self.ORDER_MODE == "CLASSIC":
+			raise Exception(f"{self.SUBMIT_MODE} submit mode needs an HF order mode, classic orders do not reject duplicate clientOids")
+
+		# Final states returned by the HF sync endpoints, done orders never change
+		self._sync_orders = OrderedDict()
+		self._sync_orders_lock = Lock()
 
 		if self.CREDS['account_type'].lower() in ['sandbox','testnet','test','demo']:
 			self.url = self.SANDBOX_ENDPOINT
 		else:
 			self.url = self.LIVE_ENDPOINT
 
+		# Fill callbacks, kept here so they can be registered before start_user_stream
+		self._fill_listeners = []
+
+		# Pooled keep-alive transport with the auth material precomputed
+		self.session = KucoinSession(self.url, creds, is_v1_api=self.is_v1_api)
+
+		hedge_send = None
+		if self.SUBMIT_MODE == "HEDGED":
+			self._hedge_session = KucoinSession(self.url, creds, is_v1_api=self.is_v1_api)
+			hedge_send = lambda endpoint, params: self.check_response_data(self._hedge_session.request('POST', endpoint, params=params))
+
+		# Timeout safe placement, see KucoinOrderSubmitter
+		self._submitter = KucoinOrderSubmitter(
+			lambda endpoint, params: self._request('POST', endpoint, params=params),
+			lambda params: self.get_order_by_client_oid(params['clientOid'], params['symbol']),
+			KucoinSession.NETWORK_ERRORS,
+			retries=submit_retries,
+			hedge_send=hedge_send,
+		)
+
+		# Accounts snapshot indexed by id and (currency, type), refetched after account_max_staleness seconds without the push channel
+		self._accounts = KucoinAccountCache(lambda: self._request('GET', '/api/v1/accounts'), max_staleness=account_max_staleness)
+
+		# Paginated concurrent candle downloads, startAt/endAt in seconds and at most 1500 candles per request
+		self._kline_backfill = KucoinKlineBackfill(self._fetch_candles, limit=1500, columns=['datetime','open','close','high','low','volume','turnover'], time_unit='s')
+
 	# Private methods
 	def _request(self, method, uri, timeout=5, auth=True, params=None):
-		uri_path = uri
-		data_json = ''
-		if method in ['GET', 'DELETE']:
-			if params:
-				strl = []
-				for key in sorted(params):
-					strl.append("{}={}".format(key, params[key]))
-				data_json += '&'.join(strl)
-				uri += '?' + data_json
-				uri_path = uri
-		else:
-			if params:
-				data_json = json.dumps(params)
-
-				uri_path = uri + data_json
-
-		headers = {}
-		if auth:
-			now_time = int(time.time()) * 1000
-			str_to_sign = str(now_time) + method + uri_path
-			sign = base64.b64encode(
-				hmac.new(self.CREDS['api_secret'].encode('utf-8'), str_to_sign.encode('utf-8'), hashlib.sha256).digest())
-			if self.is_v1_api:
-				headers = {
-					"KC-API-SIGN": sign,
-					"KC-API-TIMESTAMP": str(now_time),
-					"KC-API-KEY": self.CREDS['api_key'],
-					"KC-API-PASSPHRASE": self.CREDS['passphrase'],
-					"Content-Type": "application/json"
-				}
-			else:
-				passphrase = base64.b64encode(
-					hmac.new(self.CREDS['api_secret'].encode('utf-8'), self.CREDS['passphrase'].encode('utf-8'), hashlib.sha256).digest())
-				headers = {
-					"KC-API-SIGN": sign,
-					"KC-API-TIMESTAMP": str(now_time),
-					"KC-API-KEY": self.CREDS['api_key'],
-					"KC-API-PASSPHRASE": passphrase,
-					"Content-Type": "application/json",
-					"KC-API-KEY-VERSION": "2"
-				}
-		headers["User-Agent"] = "kucoin-python-sdk/" + '1.0.0' #version
-		url = urljoin(self.url, uri)
-
-		if method in ['GET', 'DELETE']:
-			response_data = requests.request(method, url, headers=headers, timeout=timeout)
-		else:
-			response_data = requests.request(method, url, headers=headers, data=data_json, timeout=timeout)
+		response_data = self.session.request(method, uri, timeout=timeout, auth=auth, params=params)
 		return self.check_response_data(response_data)
-	
+
+	def _fetch_candles(self, symbol:str, timeframe:str, start_ms:int, end_ms:int) -> list:
+		"""
+		Downloads the candles of one [start_ms, end_ms) window\n
+		"""
+		_frame = {
+			'm':'min',
+			'h':'hour',
+			'd':'day',
+			'w':'week'
+		}
+		params = {
+			'symbol':symbol,
+			'type': timeframe[:-1] + _frame[timeframe[-1]],
+			'startAt':start_ms // 1000,
+			'endAt':(end_ms - 1) // 1000
+		}
+		return self._request('GET','/api/v1/market/candles',params=params)
+
+	def _put_sync_order(self, order:dict) -> None:
+		"""
+		Stores the state returned by an HF sync endpoint in the REST order fields\n
+		NOTE Fields the sync response does not carry (dealFunds, fee ...) are None, same as orders from the order stream\n
+		"""
+		result = order
+		order = dict.fromkeys(KucoinOrderStream.REST_FIELDS[self.MARKET])
+		order.update({
+			"id":result['orderId'],
+			"symbol":result['symbol'],
+			"type":result.get('type'),
+			"side":result.get('side'),
+			"price":result.get('price'),
+			"size":result.get('originSize', result.get('size')),
+			"dealSize":result.get('dealSize'),
+			"remainSize":result.get('remainSize'),
+			"cancelledSize":result.get('canceledSize', result.get('cancelledSize')),
+			"clientOid":result.get('clientOid'),
+			"status":result['status'],
+			"isActive":result['status'] != 'done',
+			"createdAt":result.get('orderTime'),
+		})
+		if not order['isActive']:
+			with self._sync_orders_lock:
+				self._sync_orders[order['id']] = order
+				if len(self._sync_orders) > self.SYNC_ORDERS_LIMIT:
+					self._sync_orders.popitem(last=False)
+		self._user_stream and self._user_stream.put_order(order)
+
+	def _get_hf_params(self, symbol:str) -> dict:
+		if symbol is None:
+			raise Exception(f"symbol is required to cancel or query orders in {self.ORDER_MODE} mode")
+		return {'symbol':symbol}
+
 	@staticmethod
 	def check_response_data(response_data):
 		if response_data.status_code == 200:
@@ -124,19 +194,11 @@ class KucoinSPOTAPIREST:
 	def get_account_info(self, account_id:str=None) -> dict:
 		"""
 		Get the account information\n
+		NOTE Read from the accounts snapshot cache\n
 		"""
-		method = "GET"
-		endpoint = "/api/v1/accounts"
-		all_accounts = self._request(method, endpoint)
-		
 		if account_id is not None:
-			for account in all_accounts:
-				if account['id'] == account_id:
-					return account
-		else:
-			for account in all_accounts:
-				if account['currency'] == 'USDT':
-					return account
+			return self._accounts.get_by_id(account_id)
+		return self._accounts.get('USDT')
 
 	def get_asset_info(self, asset:str) -> dict:
 		"""
@@ -155,50 +217,61 @@ class KucoinSPOTAPIREST:
 			if market['symbol'] == asset.upper():
 				return market
 
-	def get_account_balance(self, asset:str) -> float:
+	def get_account_balance(self, asset:str, account_type:str=None) -> float:
 		"""
 		Get account free asset balance\n
 		Params:
-			asset	:	str		asset in the account. ie. USDT
+			asset			:	str		asset in the account. ie. USDT
+			account_type	:	str		main, trade ... default the first account of the asset
 		Returns:
 			Free asset balance that can be used in trading
+		NOTE Read from the accounts snapshot cache\n
 		"""
-		method = "GET"
-		endpoint = "/api/v1/accounts"
-		all_accounts = self._request(method, endpoint)
-		
-		for account in all_accounts:
-			if account['currency'] == asset.upper():
-				return float(account['available'])
+		account = self._accounts.get(asset.upper(), account_type)
+		if account is not None:
+			return float(account['available'])
+
+	def start_balance_stream(self) -> KucoinBalanceStream:
+		"""
+		Keeps the accounts snapshot current from the /account/balance push channel\n
+		"""
+		self._balance_stream = KucoinBalanceStream(lambda: self._request('POST', '/api/v1/bullet-private'), self._accounts)
+		self._balance_stream.start()
+		return self._balance_stream
 
-	def get_candle_data(self, symbol:str, timeframe:str, period:str='1d') -> pd.DataFrame:
+	def get_candle_data(self, symbol:str, timeframe:str, period:str='1d', max_workers:int=4) -> pd.DataFrame:
 		"""
-		Get realtime candlestick data\n
+		Get historical candlestick data\n
 		symbol		: 	str 	= symbol of the ticker\n
-		timeframe	: 	str 	= timeframe of the candles\n
-		period		:	str		= period of the data\n
+		timeframe	: 	str 	= timeframe of the candles. ie. 1m, 15m, 1h, 1d\n
+		period		:	str		= period of the data up to now. ie. 1d, 2w\n
+		max_workers	:	int		= windows downloaded at once\n
 		"""
-		_frame = {
-			'm':'min',
-			'h':'hour'
-		}
-		params = {
-			'symbol':symbol,
-			'type': timeframe[:-1] + _frame[timeframe[-1]]
-		}
-		data = self._request('GET','/api/v1/market/candles',params=params)
-		df = pd.DataFrame(data)
-		df = df.rename({0:"datetime",1:"open",2:"close",3:"high",4:"low",5:"volume"}, axis='columns')
-		df.set_index('datetime', inplace=True)
-		df = df[['open','high','low','close','volume']]
-		df.index = df.index.astype(int)
-		df['open'] = df['open'].astype(float)
-		df['high'] = df['high'].astype(float)
-		df['low'] = df['low'].astype(float)
-		df['close'] = df['close'].astype(float)
-		df['volume'] = df['volume'].astype(float)
-		df.index = [datetime.fromtimestamp(x,pytz.timezone(self.TIMEZONE)) for x in df.index]
-		return df[::-1]
+		start_ms = int((pd.Timestamp.now(tz='UTC') - pd.Timedelta(period)).timestamp() * 1000)
+		return self._kline_backfill.get_candle_data(symbol, timeframe, start_ms, max_workers=max_workers)
+
+	def stream_full_order_books(self, symbols:list) -> KucoinBookStream:
+		"""
+		Keeps a full depth local order book of each symbol from a level 2 snapshot and the level2 deltas\n
+		Params:
+			symbols	:	list	=	symbols to replicate
+		Returns:
+			The running stream, read it with get_full_order_book
+		"""
+		self._book_stream = KucoinBookStream(
+			lambda: self._request('POST', '/api/v1/bullet-public', auth=False),
+			lambda symbol: self._request('GET', '/api/v3/market/orderbook/level2', params={'symbol':symbol}),
+			symbols,
+			market=self.MARKET,
+		)
+		self._book_stream.start()
+		return self._book_stream
+
+	def get_full_order_book(self, symbol:str) -> KucoinOrderBook:
+		"""
+		Returns the local book of the symbol with best bid/ask, depth at price and VWAP queries, check is_synced before trading on it\n
+		"""
+		return self._book_stream.get_book(symbol)
 
 	def place_order(self, symbol:str, side:str, quantity:str, order_type:str="MARKET", price:float=None) -> str:
 		"""
@@ -212,6 +285,8 @@ class KucoinSPOTAPIREST:
 		
 		Returns:
 			order id will be returned if order executed successfully
+		NOTE In HF_SYNC mode the returned fill state is stored, query_order of a done order needs no request\n
+		NOTE In RETRY and HEDGED submit modes a timeout is resolved by clientOid, the order is never placed twice\n
 		"""
 		clOrderId = self._return_unique_id
 		params = {
@@ -225,28 +300,171 @@ class KucoinSPOTAPIREST:
 		if order_type.lower() == "limit":
 			params['price'] = price
 
-		response = self._request('POST','/api/v1/orders',params=params)
+		if self.SUBMIT_MODE == "DIRECT":
+			response = self._request('POST',self.ORDER_ENDPOINTS[self.ORDER_MODE],params=params)
+		else:
+			response = self._submitter.submit(self.ORDER_ENDPOINTS[self.ORDER_MODE], params)
+		if self.ORDER_MODE == "HF_SYNC" and 'status' in response:
+			self._put_sync_order({**params, **response})
 		return response['orderId']
 
-	def query_order(self, order_id:str) -> dict:
+	def place_orders(self, orders:list, max_workers:int=4) -> list:
+		"""
+		Places many orders through the multi order endpoint of the ORDER_MODE, MULTI_ORDERS_LIMIT orders of one symbol per request with requests sent concurrently\n
+		Params:
+			orders		:	list	=	orders as dicts of place_order params. ie. [{"symbol":"BTC-USDT","side":"buy","quantity":0.001,"order_type":"LIMIT","price":21000}]
+			max_workers	:	int		=	requests in flight at once
+		Returns:
+			One response per order in the given order, with id and status success or fail with failMsg
+		NOTE The multi endpoints take limit orders only, other orders are sent one per request alongside\n
+		"""
+		results = [None] * len(orders)
+		batches, singles = {}, []
+		for i, order in enumerate(orders):
+			params = {
+				'side':order['side'],
+				'type':order.get('order_type', "MARKET").lower(),
+				'size':order['quantity'],
+				'clientOid':self._return_unique_id
+			}
+			if params['type'] == "limit":
+				params['price'] = order['price']
+				batches.setdefault(order['symbol'], []).append((i, params))
+			else:
+				params['symbol'] = order['symbol']
+				singles.append((i, params))
+
+		endpoint = self.MULTI_ORDER_ENDPOINTS[self.ORDER_MODE]
+
+		def send_multi(item:tuple) -> list:
+			symbol, batch = item
+			try:
+				if self.ORDER_MODE == "CLASSIC":
+					params = {
+						'symbol':symbol,
+						'orderList':[params for _, params in batch]
+					}
+					return self._request('POST',endpoint,params=params)['data']
+
+				# HF batches carry the symbol per order and answer success with orderId or failMsg per order
+				order_list = [{**params, 'symbol':symbol} for _, params in batch]
+				responses = []
+				for params, response in zip(order_list, self._request('POST',endpoint,params={'orderList':order_list})):
+					if not response.get('success'):
+						responses.append({**params, 'status':"fail", 'failMsg':response.get('failMsg')})
+						continue
+					if self.ORDER_MODE == "HF_SYNC" and 'status' in response:
+						self._put_sync_order({**params, **response})
+					responses.append({**params, 'id':response['orderId'], 'status':"success"})
+				return responses
+			except Exception as e:
+				return [{**params, 'symbol':symbol, 'status':"fail", 'failMsg':str(e)} for _, params in batch]
+
+		def send_single(item:tuple) -> list:
+			_, params = item
+			try:
+				response = self._request('POST',self.ORDER_ENDPOINTS[self.ORDER_MODE],params=params)
+				if self.ORDER_MODE == "HF_SYNC" and 'status' in response:
+					self._put_sync_order({**params, **response})
+				return [{**params, 'id':response['orderId'], 'status':"success"}]
+			except Exception as e:
+				return [{**params, 'status':"fail", 'failMsg':str(e)}]
+
+		tasks = [(send_multi, (symbol, bodies[i:i + self.MULTI_ORDERS_LIMIT]), bodies[i:i + self.MULTI_ORDERS_LIMIT]) for symbol, bodies in batches.items() for i in range(0, len(bodies), self.MULTI_ORDERS_LIMIT)]
+		tasks += [(send_single, item, [item]) for item in singles]
+		if tasks:
+			with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+				for (_, _, batch), responses in zip(tasks, executor.map(lambda task: task[0](task[1]), tasks)):
+					for (i, _), response in zip(batch, responses):
+						results[i] = response
+		return results
+
+	def query_order(self, order_id:str, symbol:str=None) -> dict:
 		"""
 		Queries order\n
 		Params:
 			order_id	:	str		= order id to get the information of
+			symbol		:	str		= symbol of the order, required in HF modes
+		NOTE Answered from the order stream store while it is live, REST on cache miss or while it reconnects\n
+		"""
+		order = (self._user_stream and self._user_stream.get_order(order_id)) or self._sync_orders.get(order_id)
+		if not order:
+			method = "GET"
+			if self.ORDER_MODE == "CLASSIC":
+				order = self._request(method, f"/api/v1/orders/{order_id}")
+			else:
+				order = self._request(method, f"/api/v1/hf/orders/{order_id}", params=self._get_hf_params(symbol))
+			self._user_stream and self._user_stream.put_order(order)
+		return order
+
+	def get_order_by_client_oid(self, client_oid:str, symbol:str=None) -> dict:
+		"""
+		Queries order by the client order id\n
+		Params:
+			client_oid	:	str		= clientOid sent with the order
+			symbol		:	str		= symbol of the order, required in HF modes
+		NOTE Raises KucoinOrderNotFound when the exchange answers the order does not exist\n
 		"""
 		method = "GET"
-		endpoint = f"/api/v1/orders/{order_id}"
-		return self._request(method, endpoint)
+		if self.ORDER_MODE == "CLASSIC":
+			response_data = self.session.request(method, f"/api/v1/order/client-order/{client_oid}")
+		else:
+			response_data = self.session.request(method, f"/api/v1/hf/orders/client-order/{client_oid}", params=self._get_hf_params(symbol))
+		return check_lookup_response(response_data, self.check_response_data)
+
+	def start_user_stream(self) -> KucoinOrderStream:
+		"""
+		Streams order changes of the account into a local store\n
+		Returns:
+			The running stream, query_order reads from it and add_fill_listener registers fill callbacks
+		"""
+		self._user_stream = KucoinOrderStream(lambda: self._request('POST', '/api/v1/bullet-private'), market=self.MARKET)
+		for callback in self._fill_listeners:
+			self._user_stream.add_fill_listener(callback)
+		self._user_stream.start()
+		return self._user_stream
+
+	def add_fill_listener(self, callback) -> None:
+		"""
+		Registers a callable receiving every fill pushed on the order stream\n
+		Params:
+			callback	:	callable	= receives {symbol, orderId, clientOid, tradeId, side, price, size, liquidity, time}
+		NOTE Callbacks registered before start_user_stream are attached when the stream starts\n
+		"""
+		self._fill_listeners.append(callback)
+		self._user_stream and self._user_stream.add_fill_listener(callback)
 
-	def cancel_order(self, order_id:str) -> None:
+	def cancel_order(self, order_id:str, symbol:str=None) -> None:
 		"""
 		Cancel an open order\n
 		Params:
 			order_id	:	str		= order id to cancel if active\n
+			symbol		:	str		= symbol of the order, required in HF modes\n
+		"""
+		method = "DELETE"
+		endpoint = f"{self.ORDER_ENDPOINTS[self.ORDER_MODE]}/{order_id}"
+		if self.ORDER_MODE == "CLASSIC":
+			self._request(method, endpoint)
+		else:
+			response = self._request(method, endpoint, params=self._get_hf_params(symbol))
+			if self.ORDER_MODE == "HF_SYNC":
+				self._put_sync_order({'symbol':symbol, **response})
+
+	def cancel_all(self, symbol:str) -> list:
+		"""
+		Cancels all open orders of a symbol in one request\n
+		Params:
+			symbol	:	str		= symbol of the ticker
+		Returns:
+			Ids of the cancelled orders, empty in HF modes where the endpoint only reports success
 		"""
 		method = "DELETE"
-		endpoint = f"/api/v1/orders/{order_id}"
-		self._request(method, endpoint)
+		endpoint = "/api/v1/orders" if self.ORDER_MODE == "CLASSIC" else "/api/v1/hf/orders"
+		params = {
+			'symbol':symbol
+		}
+		response = self._request(method, endpoint, params=params)
+		return response.get('cancelledOrderIds', []) if isinstance(response, dict) else []
 
 if __name__ == "__main__":
 
@@ -0,0 +1,125 @@
+# Author - Karan Parmar
+
+"""
+KUCOIN ORDER SUBMITTER
+
+	Timeout safe order placement. When a placement times out or its connection resets the order may or may not have reached
+	the exchange, so the outcome is resolved by looking the order up by its clientOid before anything is sent again.
+	Resends reuse the same clientOid and happen only after the exchange kept answering that no order has it until SETTLE
+	seconds after the failed send, so a placement still in flight has landed before anything is sent again. Any other lookup
+	failure (network, 5xx, 429, auth) leaves the outcome unknown and raises instead, classic endpoints accept a duplicate
+	clientOid so a resend on a guess could place the order twice.
+
+	Hedged mode sends every placement twice at once over two connection pools and takes the first answer. It relies on the
+	exchange rejecting the duplicate clientOid, which the HF endpoints do.
+"""
+
+# Importing built-in libraries
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+class KucoinOrderNotFound(Exception):
+	"""
+	The exchange answered that no order has the clientOid\n
+	"""
+
+def check_lookup_response(response_data, check_response_data) -> dict:
+	"""
+	Returns the order of a clientOid lookup response\n
+	Params:
+		response_data		:	requests.Response	= lookup response
+		check_response_data	:	callable			= the adapter's response check, raises on error codes
+	NOTE Raises KucoinOrderNotFound only on an explicit not found answer, code 400100 or an empty data\n
+	"""
+	try:
+		data = response_data.json()
+	except ValueError:
+		data = None
+	if isinstance(data, dict) and (data.get('code') == '400100' or (data.get('code') == '200000' and not data.get('data'))):
+		raise KucoinOrderNotFound(response_data.text)
+
+	order = check_response_data(response_data)
+	if not isinstance(order, dict) or 'id' not in order:
+		raise Exception(f"unexpected lookup response {response_data.text}")
+	return order
+
+class KucoinOrderSubmitter:
+
+	def __init__(self, send, lookup, network_errors:tuple, retries:int=2, grace:float=1, settle:float=15, hedge_send=None):
+		"""
+		Params:
+			send			:	callable	= placement request, send(endpoint, params) -> response
+			lookup			:	callable	= order by clientOid, lookup(params) -> order, raises KucoinOrderNotFound when the order does not exist
+			network_errors	:	tuple		= exceptions leaving the outcome unknown. ie. KucoinSession.NETWORK_ERRORS
+			retries			:	int			= resends after an unknown outcome resolved as not placed
+			grace			:	float		= seconds between lookups
+			settle			:	float		= seconds after the failed send before a not found answer is trusted, above the request timeout
+			hedge_send		:	callable	= placement over a second connection pool, enables hedged sends
+		"""
+		self.RETRIES = retries
+		self.GRACE = grace
+		self.SETTLE = settle
+		self.NETWORK_ERRORS = network_errors
+
+		self._send = send
+		self._lookup = lookup
+		self._hedge_send = hedge_send
+		self._executor = ThreadPoolExecutor(max_workers=4) if hedge_send else None
+
+	# Private methods
+	def _send_hedged(self, endpoint:str, params:dict) -> dict:
+		"""
+		Sends the placement over both pools and returns the first success\n
+		"""
+		futures = [self._executor.submit(send, endpoint, params) for send in (self._send, self._hedge_send)]
+		errors = []
+		for future in as_completed(futures):
+			try:
+				return future.result()
+			except Exception as e:
+				errors.append(e)
+		# A duplicate rejection next to a network error still leaves the outcome to the lookup
+		for error in errors:
+			if isinstance(error, self.NETWORK_ERRORS):
+				raise error
+		raise errors[0]
+
+	def _resolve(self, params:dict, sent_at:float) -> dict:
+		"""
+		Returns the order of the clientOid, None when the exchange still answers it was not placed SETTLE seconds after the send\n
+		NOTE Raises when the lookup cannot be completed, the order must not be resent then\n
+		"""
+		errors = 0
+		while True:
+			time.sleep(self.GRACE)
+			try:
+				return self._lookup(params)
+			except KucoinOrderNotFound:
+				if time.time() - sent_at >= self.SETTLE:
+					return None
+			except Exception as e:
+				errors += 1
+				if errors >= 3:
+					raise Exception(f"outcome of order {params['clientOid']} unknown, lookup by clientOid failed, {e}")
+
+	# Public methods
+	def submit(self, endpoint:str, params:dict) -> dict:
+		"""
+		Places an order at most once\n
+		Returns:
+			The placement response, or {orderId, clientOid, order} when the order was found by the lookup
+		"""
+		error = None
+		for _ in range(self.RETRIES + 1):
+			sent_at = time.time()
+			try:
+				if self._hedge_send is not None:
+					return self._send_hedged(endpoint, params)
+				return self._send(endpoint, params)
+			except self.NETWORK_ERRORS as e:
+				error = e
+
+			order = self._resolve(params, sent_at)
+			if order is not None:
+				return {'orderId':order['id'], 'clientOid':params['clientOid'], 'order':order}
+		raise Exception(f"order {params['clientOid']} not placed after {self.RETRIES + 1} attempts, {error}")
@@ -0,0 +1,306 @@
+# Author - Karan Parmar
+
+"""
+KUCOIN WEBSOCKET STREAMS
+
+	Push channels for the Kucoin SPOT and FUTURES REST adapters.
+	Every connection asks the adapter for a fresh bullet token, subscribes its topics after the welcome message and sends
+	the application level ping Kucoin expects every pingInterval. Sockets are reconnected on their own thread until stopped.
+"""
+
+# Importing built-in libraries
+import json, time
+from uuid import uuid4
+from itertools import count
+from threading import Thread
+
+# Importing third-party libraries
+from websocket import WebSocketApp			# pip install websocket-client
+
+class KucoinWSAPP:
+
+	def __init__(self, get_token, topics:list, private:bool=False):
+		"""
+		Params:
+			get_token	:	callable	= bullet token request. ie. lambda: api._request('POST', '/api/v1/bullet-private')
+			topics		:	list		= topics to subscribe. ie. ['/spotMarket/tradeOrders']
+			private		:	bool		= topics are private channels
+		"""
+		self.PRIVATE = private
+
+		self._get_token = get_token
+		self.topics = list(topics)
+		self.ping_interval = 18
+
+		self.WSAPP = None
+		self.is_live = False
+		self._ids = count(1)
+		self._can_disconnect = False
+
+	# Private methods
+	def _get_url(self) -> str:
+		"""
+		Returns the socket url of a fresh bullet token\n
+		"""
+		bullet = self._get_token()
+		server = bullet['instanceServers'][0]
+		self.ping_interval = server['pingInterval'] / 1000
+		return f"{server['endpoint']}?token={bullet['token']}&connectId={uuid4().hex}"
+
+	def _send(self, ws, message:dict) -> None:
+		message['id'] = str(next(self._ids))
+		ws.send(json.dumps(message))
+
+	def _subscribe(self, ws) -> None:
+		for topic in self.topics:
+			self._send(ws, {"type":"subscribe", "topic":topic, "privateChannel":self.PRIVATE, "response":True})
+
+	def _ping(self, ws) -> None:
+		"""
+		Sends the application level ping until the socket closes\n
+		"""
+		while self.WSAPP is ws and not self._can_disconnect:
+			time.sleep(self.ping_interval)
+			try:
+				self._send(ws, {"type":"ping"})
+			except Exception:
+				return
+
+	def _on_open(self, ws) -> None:
+		...
+
+	def _on_welcome(self, ws) -> None:
+		"""
+		Subscribes the topics once the server accepts the connection\n
+		"""
+		self._subscribe(ws)
+		self.is_live = True
+		Thread(target=self._ping, args=(ws,), daemon=True).start()
+
+	def _on_message(self, ws, raw:str) -> None:
+		message = json.loads(raw)
+		kind = message.get('type')
+		if kind == 'message':
+			self._on_topic(message['topic'], message.get('subject'), message['data'])
+		elif kind == 'welcome':
+			self._on_welcome(ws)
+		elif kind == 'error':
+			print("KUCOIN_WS_ERROR", message)
+
+	def _on_topic(self, topic:str, subject:str, data:dict) -> None:
+		"""
+		Handles one topic message, overridden by the streams\n
+		"""
+		...
+
+	def _on_close(self, ws, close_code, close_message) -> None:
+		self.is_live = False
+		print("KUCOIN_WS_DISCONNECTED", close_code, close_message)
+
+	def _on_error(self, ws, error) -> None:
+		print("KUCOIN_WS_ERROR", error)
+
+	def _run(self) -> None:
+		"""
+		Runs the socket and reconnects it with a new token until stopped\n
+		"""
+		while not self._can_disconnect:
+			try:
+				url = self._get_url()
+			except Exception as e:
+				print("KUCOIN_WS_ERROR", e)
+				time.sleep(5)
+				continue
+			self.WSAPP = WebSocketApp(
+				url=url,
+				on_open=self._on_open,
+				on_message=self._on_message,
+				on_close=self._on_close,
+				on_error=self._on_error,
+			)
+			self.WSAPP.run_forever()
+			self.is_live = False
+			if not self._can_disconnect:
+				time.sleep(1)
+
+	# Public methods
+	def start(self) -> None:
+		"""
+		Connects the socket\n
+		"""
+		self._can_disconnect = False
+		Thread(target=self._run, daemon=True).start()
+
+	def stop(self) -> None:
+		"""
+		Disconnects the socket\n
+		"""
+		self._can_disconnect = True
+		self.WSAPP and self.WSAPP.close()
+
+class KucoinOrderStream(KucoinWSAPP):
+
+	TOPICS = {
+		"SPOT":"/spotMarket/tradeOrders",
+		"FUTURES":"/contractMarket/tradeOrders",
+	}
+
+	# Fields of the REST order, stored orders carry all of them so query_order has one shape with or without the stream
+	# NOTE Fields the push channel does not carry (dealFunds, fee, timeInForce ...) are None until a REST read fills them
+	REST_FIELDS = {
+		"SPOT":[
+			"id", "symbol", "opType", "type", "side", "price", "size", "funds", "dealFunds", "dealSize", "fee", "feeCurrency",
+			"stp", "stop", "stopTriggered", "stopPrice", "timeInForce", "postOnly", "hidden", "iceberg", "visibleSize",
+			"cancelAfter", "channel", "clientOid", "remark", "tags", "isActive", "cancelExist", "createdAt", "tradeType",
+		],
+		"FUTURES":[
+			"id", "symbol", "type", "side", "price", "size", "value", "dealValue", "dealSize", "stp", "stop", "stopPriceType",
+			"stopTriggered", "stopPrice", "timeInForce", "postOnly", "hidden", "iceberg", "leverage", "forceHold", "closeOrder",
+			"visibleSize", "clientOid", "remark", "tags", "isActive", "cancelExist", "createdAt", "updatedAt", "endAt",
+			"orderTime", "settleCurrency", "status", "filledSize", "filledValue", "reduceOnly",
+		],
+	}
+
+	def __init__(self, get_token, market:str="SPOT"):
+		"""
+		Params:
+			get_token	:	callable	= private bullet token request. ie. lambda: api._request('POST', '/api/v1/bullet-private')
+			market		:	str			= SPOT or FUTURES
+		"""
+		self.MARKET = market.upper()
+		super().__init__(get_token, [self.TOPICS[self.MARKET]], private=True)
+
+		# Local order store kept current from the stream
+		self.orders = {}
+		self.client_oids = {}
+		self.fills = []
+
+		# Callables receiving every raw event and every fill, see add_listener and add_fill_listener
+		self._listeners = []
+		self._fill_listeners = []
+
+	# Private methods
+	def _on_welcome(self, ws) -> None:
+		"""
+		Events missed while disconnected are lost, start from an empty store\n
+		"""
+		self.orders.clear()
+		self.client_oids.clear()
+		super()._on_welcome(ws)
+
+	def _on_topic(self, topic:str, subject:str, data:dict) -> None:
+		for listener in self._listeners:
+			listener(data)
+
+		if subject != 'orderChange':
+			return
+
+		# Push fields mapped to the REST order fields, times are nanoseconds on the push channel
+		order = self.orders.get(data['orderId'])
+		if order is None:
+			order = self.orders[data['orderId']] = dict.fromkeys(self.REST_FIELDS[self.MARKET])
+		order.update({
+			"id":data['orderId'],
+			"symbol":data['symbol'],
+			"type":data.get('orderType', order.get('type')),
+			"side":data['side'],
+			"price":data.get('price', order.get('price')),
+			"size":data.get('size', order.get('size')),
+			"dealSize":data.get('filledSize', order.get('dealSize')),
+			"filledSize":data.get('filledSize', order.get('filledSize')),
+			"remainSize":data.get('remainSize', order.get('remainSize')),
+			"clientOid":data.get('clientOid', order.get('clientOid')),
+			"status":data['status'],
+			"isActive":data['status'] != 'done',
+			"cancelExist":data['type'] == 'canceled' or order.get('cancelExist', False),
+			"createdAt":data['orderTime'] // 1000000 if 'orderTime' in data else order.get('createdAt'),
+			"updatedAt":data['ts'] // 1000000,
+		})
+		if order['clientOid']:
+			self.client_oids[order['clientOid']] = data['orderId']
+
+		if data['type'] == 'match':
+			fill = {
+				"symbol":data['symbol'],
+				"orderId":data['orderId'],
+				"clientOid":order['clientOid'],
+				"tradeId":data.get('tradeId'),
+				"side":data['side'],
+				"price":data['matchPrice'],
+				"size":data['matchSize'],
+				"liquidity":data.get('liquidity'),
+				"time":data['ts'] // 1000000,
+			}
+			self.fills.append(fill)
+			for listener in self._fill_listeners:
+				try:
+					listener(fill)
+				except Exception as e:
+					print("KUCOIN_FILL_LISTENER_ERROR", e)
+
+	# Public methods
+	def add_listener(self, callback) -> None:
+		"""
+		Registers a callable receiving every raw order event\n
+		"""
+		self._listeners.append(callback)
+
+	def add_fill_listener(self, callback) -> None:
+		"""
+		Registers a callable receiving every fill as {symbol, orderId, clientOid, tradeId, side, price, size, liquidity, time}\n
+		"""
+		self._fill_listeners.append(callback)
+
+	def get_order(self, order_id:str) -> dict:
+		"""
+		Returns the stored order by orderId or clientOid, None when unknown or while the stream is down\n
+		"""
+		if not self.is_live:
+			return None
+		order = self.orders.get(order_id)
+		if order is None and order_id in self.client_oids:
+			order = self.orders.get(self.client_oids[order_id])
+		return order
+
+	def put_order(self, order:dict) -> None:
+		"""
+		Stores an order fetched over REST\n
+		NOTE Push state already stored is kept as newer than a REST read, the REST read only fills the fields still None\n
+		"""
+		if not self.is_live or not order:
+			return
+		stored = self.orders.setdefault(order['id'], dict(order))
+		for key, value in order.items():
+			if stored.get(key) is None:
+				stored[key] = value
+		if order.get('clientOid'):
+			self.client_oids[order['clientOid']] = order['id']
+
+class KucoinBalanceStream(KucoinWSAPP):
+
+	def __init__(self, get_token, cache):
+		"""
+		Params:
+			get_token	:	callable			= private bullet token request. ie. lambda: api._request('POST', '/api/v1/bullet-private')
+			cache		:	KucoinAccountCache	= accounts snapshot kept current from the account.balance events
+		"""
+		super().__init__(get_token, ["/account/balance"], private=True)
+
+		self.cache = cache
+
+	# Private methods
+	def _on_welcome(self, ws) -> None:
+		"""
+		Balance changes missed while disconnected are lost, the snapshot is refetched on the next read\n
+		"""
+		self.cache.invalidate()
+		super()._on_welcome(ws)
+		self.cache.is_live = True
+
+	def _on_close(self, ws, close_code, close_message) -> None:
+		self.cache.is_live = False
+		super()._on_close(ws, close_code, close_message)
+
+	def _on_topic(self, topic:str, subject:str, data:dict) -> None:
+		if subject == 'account.balance':
+			self.cache.on_balance(data)
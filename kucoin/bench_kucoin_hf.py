@@ -0,0 +1,82 @@
+# Author - Karan Parmar
+
+"""
+KUCOIN ORDER MODE LATENCY BENCHMARK
+
+	Measures the time until the fill state of a new order is known in each order mode of KucoinSPOTAPIREST on a local
+	stand-in server. CLASSIC and HF need place_order then query_order, HF_SYNC returns the fill state with the placement.
+	Matching engine latency is not part of the stand-in, a fixed per request delay can be added to model it.
+
+	Run from this directory:
+		python bench_kucoin_hf.py [orders] [delay_ms]
+"""
+
+# Importing built-in libraries
+import sys, json, time, socket, statistics
+from threading import Thread
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Importing local modules
+from api_kucoin_spot_rest import KucoinSPOTAPIREST
+
+CREDS = {"api_key":"key", "api_secret":"secret", "passphrase":"passphrase", "account_type":"live"}
+DELAY = 0
+
+class StandIn(BaseHTTPRequestHandler):
+
+	protocol_version = "HTTP/1.1"
+
+	def setup(self):
+		super().setup()
+		self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+	def _respond(self, data:dict):
+		self.rfile.read(int(self.headers.get('Content-Length', 0)))
+		DELAY and time.sleep(DELAY)
+		body = json.dumps({"code":"200000", "data":data}).encode()
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def do_POST(self):
+		if self.path.endswith("/sync"):
+			self._respond({"orderId":"1", "orderTime":0, "originSize":"0.001", "dealSize":"0.001", "remainSize":"0", "canceledSize":"0", "status":"done", "matchTime":0})
+		else:
+			self._respond({"orderId":"1"})
+
+	def do_GET(self):
+		self._respond({"id":"1", "symbol":"BTC-USDT", "dealSize":"0.001", "isActive":False})
+
+	def log_message(self, *args):
+		...
+
+def run(mode:str, url:str, n:int) -> None:
+	api = KucoinSPOTAPIREST(CREDS, order_mode=mode)
+	api.session.url = url
+	latencies = []
+	start = time.perf_counter()
+	for _ in range(n):
+		t = time.perf_counter()
+		order_id = api.place_order("BTC-USDT", "buy", "0.001")
+		api.query_order(order_id, symbol="BTC-USDT")
+		# Done orders are kept locally, drop them so every iteration measures a new order
+		api._sync_orders.clear()
+		latencies.append(time.perf_counter() - t)
+	elapsed = time.perf_counter() - start
+	latencies.sort()
+	print(f"{mode:<8} orders/s {n / elapsed:>7.0f}   p50 {latencies[n // 2] * 1e6:>7.0f}us   p99 {latencies[int(n * 0.99)] * 1e6:>7.0f}us   mean {statistics.mean(latencies) * 1e6:>7.0f}us")
+
+if __name__ == "__main__":
+
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+	DELAY = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0
+
+	server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+	server.daemon_threads = True
+	Thread(target=server.serve_forever, daemon=True).start()
+	url = f"http://127.0.0.1:{server.server_port}"
+
+	for mode in ("CLASSIC", "HF", "HF_SYNC"):
+		run(mode, url, n)
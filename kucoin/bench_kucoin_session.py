@@ -0,0 +1,105 @@
+# Author - Karan Parmar
+
+"""
+KUCOIN REST TRANSPORT BENCHMARK
+
+	Compares signed requests per second of the previous per call transport (requests.request with the passphrase signed
+	on every call) against the pooled KucoinSession on a local stand-in server, so only client side overhead is measured.
+
+	Run from this directory:
+		python bench_kucoin_session.py [requests]
+"""
+
+# Importing built-in libraries
+import sys, json, time, socket, statistics
+import hmac, base64, hashlib
+from threading import Thread
+from urllib.parse import urljoin
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Importing third-party libraries
+import requests						# pip install requests
+
+# Importing local modules
+from api_kucoin_session import KucoinSession
+
+CREDS = {"api_key":"key", "api_secret":"secret", "passphrase":"passphrase"}
+BODY = json.dumps({"code":"200000", "data":{"orderId":"1"}}).encode()
+
+class StandIn(BaseHTTPRequestHandler):
+
+	protocol_version = "HTTP/1.1"
+
+	def setup(self):
+		super().setup()
+		self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+	def _respond(self):
+		self.rfile.read(int(self.headers.get('Content-Length', 0)))
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(BODY)))
+		self.end_headers()
+		self.wfile.write(BODY)
+
+	do_GET = do_POST = do_DELETE = _respond
+
+	def log_message(self, *args):
+		...
+
+def unpooled_request(url:str, method:str, uri:str, params:dict):
+	"""
+	The transport before KucoinSession, a new connection and both signatures per call\n
+	"""
+	data_json = json.dumps(params)
+	now_time = int(time.time()) * 1000
+	str_to_sign = str(now_time) + method + uri + data_json
+	sign = base64.b64encode(hmac.new(CREDS['api_secret'].encode('utf-8'), str_to_sign.encode('utf-8'), hashlib.sha256).digest())
+	passphrase = base64.b64encode(hmac.new(CREDS['api_secret'].encode('utf-8'), CREDS['passphrase'].encode('utf-8'), hashlib.sha256).digest())
+	headers = {
+		"KC-API-SIGN": sign,
+		"KC-API-TIMESTAMP": str(now_time),
+		"KC-API-KEY": CREDS['api_key'],
+		"KC-API-PASSPHRASE": passphrase,
+		"Content-Type": "application/json",
+		"KC-API-KEY-VERSION": "2",
+		"User-Agent": "kucoin-python-sdk/1.0.0",
+	}
+	return requests.request(method, urljoin(url, uri), headers=headers, data=data_json, timeout=5)
+
+def run(name:str, send, n:int) -> None:
+	latencies = []
+	start = time.perf_counter()
+	for _ in range(n):
+		t = time.perf_counter()
+		send()
+		latencies.append(time.perf_counter() - t)
+	elapsed = time.perf_counter() - start
+	latencies.sort()
+	print(f"{name:<8} requests/s {n / elapsed:>7.0f}   p50 {latencies[n // 2] * 1e6:>7.0f}us   p99 {latencies[int(n * 0.99)] * 1e6:>7.0f}us   mean {statistics.mean(latencies) * 1e6:>7.0f}us")
+
+def run_signing(name:str, sign, n:int) -> None:
+	start = time.perf_counter()
+	for _ in range(n):
+		sign()
+	print(f"{name:<8} signatures/s {n / (time.perf_counter() - start):>9.0f}")
+
+if __name__ == "__main__":
+
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+	params = {"symbol":"BTC-USDT", "side":"buy", "type":"limit", "size":"0.001", "price":"20000", "clientOid":"1"}
+
+	server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+	server.daemon_threads = True
+	Thread(target=server.serve_forever, daemon=True).start()
+	url = f"http://127.0.0.1:{server.server_port}"
+
+	session = KucoinSession(url, CREDS)
+	run("unpooled", lambda: unpooled_request(url, "POST", "/api/v1/orders", params), n)
+	run("session", lambda: session.request("POST", "/api/v1/orders", params=params), n)
+
+	# Signing alone, the part precomputation removes from every call
+	message = "1700000000000POST/api/v1/orders" + json.dumps(params)
+	secret, passphrase = CREDS['api_secret'].encode('utf-8'), CREDS['passphrase'].encode('utf-8')
+	run_signing("unpooled", lambda: (hmac.new(secret, message.encode('utf-8'), hashlib.sha256).digest(), hmac.new(secret, passphrase, hashlib.sha256).digest()), n * 50)
+	run_signing("session", lambda: session._sign(message), n * 50)